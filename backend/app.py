@@ -1,68 +1,83 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
-from model_trainer import load_or_train_model
 from prediction_service import PredictionService
+from model_artifact import artifact_version
+from model_registry import ModelRegistry, ModelReloader
+from metrics import REGISTRY, MODEL_LOAD_SECONDS, SampledProfiler, record_error, stage
+from validation import validate_predict_input, validate_sweep_input
 from functools import wraps
+import hmac
+import os
+import time
 import traceback
 
-app = Flask(__name__)
-CORS(app, resources={
-    r"/*": {
-        "origins": [
-            "http://localhost:8080", "http://127.0.0.1:8080",
-            "http://localhost:5173", "http://127.0.0.1:5173",
-            "https://housewise-predictor-32.vercel.app",
-            "https://housewisepredictor.onrender.com"
-        ],
-        "methods": ["GET", "POST", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"],
-        "expose_headers": ["Content-Type"],
-        "supports_credentials": True,
-        "max_age": 3600
-    }
-})
+# Upper bound on houses accepted by one /predict/batch request
+MAX_BATCH_SIZE = 1000
 
-def validate_predict_input(data):
-    required_fields = [
-        'bedrooms', 'bathrooms', 'squareFeet', 'lotSize',
-        'yearBuilt', 'neighborhood', 'condition', 'hasGarage', 'hasPool'
-    ]
-    
-    for field in required_fields:
-        if field not in data:
-            raise ValueError(f"Missing required field: {field}")
-    
-    try:
-        # Convert and validate numeric fields
-        bedrooms = float(data['bedrooms'])
-        bathrooms = float(data['bathrooms'])
-        square_feet = float(data['squareFeet'])
-        lot_size = float(data['lotSize'])
-        year_built = int(data['yearBuilt'])
-        
-        if bedrooms <= 0 or bedrooms > 10:
-            raise ValueError("Bedrooms must be between 1 and 10")
-        if bathrooms <= 0 or bathrooms > 10:
-            raise ValueError("Bathrooms must be between 1 and 10")
-        if square_feet < 500 or square_feet > 10000:
-            raise ValueError("Square feet must be between 500 and 10,000")
-        if lot_size < 0.1 or lot_size > 5:
-            raise ValueError("Lot size must be between 0.1 and 5 acres")
-        if year_built < 1900 or year_built > 2024:
-            raise ValueError("Year built must be between 1900 and 2024")
-            
-        # Validate categorical fields
-        if not isinstance(data['neighborhood'], str):
-            raise ValueError("Neighborhood must be a string")
-        if data['condition'] not in ['poor', 'fair', 'good', 'excellent']:
-            raise ValueError("Invalid condition value")
-        if not isinstance(data['hasGarage'], bool):
-            raise ValueError("hasGarage must be a boolean")
-        if not isinstance(data['hasPool'], bool):
-            raise ValueError("hasPool must be a boolean")
-            
-    except (ValueError, TypeError) as e:
-        raise ValueError(f"Invalid input data: {str(e)}")
+# Upper bound on grid points scored by one /predict/sweep request
+MAX_SWEEP_POINTS = 2500
+
+# Serve the active version of a model registry (see model_registry.py); takes
+# precedence over HOUSEWISE_MODEL_ARTIFACT and enables hot reloads
+MODEL_REGISTRY = os.environ.get('HOUSEWISE_MODEL_REGISTRY')
+
+# Seconds between checks of the registry manifest for a new active version (0 disables)
+MODEL_WATCH_INTERVAL = float(os.environ.get('HOUSEWISE_MODEL_WATCH_INTERVAL', '0'))
+
+# Bearer token required by the /admin endpoints; they are disabled without one
+ADMIN_TOKEN = os.environ.get('HOUSEWISE_ADMIN_TOKEN')
+
+# Serve a memory-mapped flat artifact (see model_artifact.py) instead of model.joblib
+MODEL_ARTIFACT = os.environ.get('HOUSEWISE_MODEL_ARTIFACT')
+
+# Score with the flattened NumPy forest instead of sklearn's tree objects
+FLAT_FOREST = os.environ.get('HOUSEWISE_FLAT_FOREST', '0') == '1'
+
+# 'forest' derives confidence and priceRange from the spread of the tree
+# predictions, 'heuristic' keeps the fixed input-quality checks
+CONFIDENCE_MODE = os.environ.get('HOUSEWISE_CONFIDENCE_MODE', 'forest')
+
+# In-process cache of scores for repeat valuations (size 0 disables it)
+CACHE_SIZE = int(os.environ.get('HOUSEWISE_CACHE_SIZE', '4096'))
+CACHE_TTL_SECONDS = float(os.environ.get('HOUSEWISE_CACHE_TTL_SECONDS', '3600'))
+
+# Opt-in coalescing of concurrent /predict requests into batched model calls
+MICRO_BATCHING = os.environ.get('HOUSEWISE_MICRO_BATCHING', '0') == '1'
+MICRO_BATCH_MAX_LATENCY_MS = float(os.environ.get('HOUSEWISE_MICRO_BATCH_MAX_LATENCY_MS', '2'))
+MICRO_BATCH_MAX_SIZE = int(os.environ.get('HOUSEWISE_MICRO_BATCH_MAX_SIZE', '64'))
+
+# Share of requests run under cProfile, dumped as .prof files to
+# HOUSEWISE_PROFILE_DIR; adjustable at runtime through /admin/profiling
+PROFILE_RATE = float(os.environ.get('HOUSEWISE_PROFILE_RATE', '0'))
+PROFILE_DIR = os.environ.get('HOUSEWISE_PROFILE_DIR', 'profiles')
+PROFILED_ENDPOINTS = {'predict', 'predict_batch', 'predict_sweep'}
+
+REQUESTS = REGISTRY.counter('housewise_requests_total', 'HTTP requests by endpoint and status', ['endpoint', 'method', 'status'])
+REQUEST_SECONDS = REGISTRY.histogram('housewise_request_seconds', 'HTTP request latency by endpoint', ['endpoint'])
+MODEL_INFO = REGISTRY.gauge('housewise_model_info', 'Model version being served', ['version'])
+CACHE_EVENTS = REGISTRY.gauge('housewise_cache_events', 'Prediction cache counters', ['event'])
+CACHE_ENTRIES = REGISTRY.gauge('housewise_cache_entries', 'Scores currently cached')
+MICRO_BATCHES = REGISTRY.gauge('housewise_micro_batches', 'Batches scored by the micro-batcher')
+MICRO_BATCH_ROWS = REGISTRY.gauge('housewise_micro_batch_rows', 'Rows scored by the micro-batcher')
+
+profiler = SampledProfiler(PROFILE_RATE, PROFILE_DIR)
+
+app = Flask(__name__)
+# Shared with the ASGI entry point (asgi_app.py)
+CORS_POLICY = {
+    "origins": [
+        "http://localhost:8080", "http://127.0.0.1:8080",
+        "http://localhost:5173", "http://127.0.0.1:5173",
+        "https://housewise-predictor-32.vercel.app",
+        "https://housewisepredictor.onrender.com"
+    ],
+    "methods": ["GET", "POST", "OPTIONS"],
+    "allow_headers": ["Content-Type", "Authorization"],
+    "expose_headers": ["Content-Type", "X-Model-Version"],
+    "supports_credentials": True,
+    "max_age": 3600
+}
+CORS(app, resources={r"/*": CORS_POLICY})
 
 def error_handler(f):
     @wraps(f)
@@ -70,6 +85,7 @@ def error_handler(f):
         try:
             return f(*args, **kwargs)
         except Exception as e:
+            record_error('internal', e)
             app.logger.error(f"Error: {str(e)}\n{traceback.format_exc()}")
             return jsonify({
                 'error': str(e),
@@ -78,36 +94,249 @@ def error_handler(f):
     return wrapper
 
 # Load or train the model
+reloader = None
+load_start = time.perf_counter()
 try:
-    model, encoder, scaler, cat_cols, num_cols = load_or_train_model()
-    prediction_service = PredictionService(model, encoder, scaler, cat_cols, num_cols)
+    if MODEL_REGISTRY:
+        registry = ModelRegistry(MODEL_REGISTRY)
+        model_version, model_path = registry.resolve()
+        prediction_service = PredictionService.from_file(
+            model_path, flat_forest=FLAT_FOREST, confidence_mode=CONFIDENCE_MODE,
+            model_version=model_version
+        )
+        reloader = ModelReloader(prediction_service, registry)
+        if MODEL_WATCH_INTERVAL > 0:
+            reloader.watch(MODEL_WATCH_INTERVAL)
+    elif MODEL_ARTIFACT:
+        prediction_service = PredictionService.from_artifact(
+            MODEL_ARTIFACT, confidence_mode=CONFIDENCE_MODE,
+            model_version=artifact_version(MODEL_ARTIFACT)
+        )
+    else:
+        # Imported here so that artifact-only workers never load sklearn
+        from model_trainer import MODEL_PATH, load_or_train_model
+        model, encoder, scaler, cat_cols, num_cols = load_or_train_model()
+        prediction_service = PredictionService(
+            model, encoder, scaler, cat_cols, num_cols,
+            flat_forest=FLAT_FOREST, confidence_mode=CONFIDENCE_MODE,
+            model_version=artifact_version(MODEL_PATH)
+        )
+    if CACHE_SIZE > 0:
+        prediction_service.enable_cache(CACHE_SIZE, CACHE_TTL_SECONDS)
+    if MICRO_BATCHING:
+        prediction_service.enable_micro_batching(MICRO_BATCH_MAX_LATENCY_MS, MICRO_BATCH_MAX_SIZE)
+    MODEL_LOAD_SECONDS.set(time.perf_counter() - load_start)
 except Exception as e:
     app.logger.error(f"Failed to load model: {str(e)}")
     raise
 
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    g.profile = profiler.start() if request.endpoint in PROFILED_ENDPOINTS else None
+
+@app.after_request
+def record_request(response):
+    endpoint = request.endpoint or 'unmatched'
+    REQUEST_SECONDS.labels(endpoint).observe(time.perf_counter() - g.request_start)
+    REQUESTS.labels(endpoint, request.method, str(response.status_code)).inc()
+    return response
+
+@app.teardown_request
+def dump_profile(exc):
+    if g.get('profile') is not None:
+        profiler.stop(g.profile, request.endpoint or 'unmatched')
+
 @app.route('/predict', methods=['POST'])
 @error_handler
 def predict():
     """API endpoint for price predictions"""
-    data = request.get_json()
+    with stage('json_parse'):
+        data = request.get_json()
     if not data:
+        record_error('validation', 'NoData')
         return jsonify({'error': 'No data provided', 'status': 'error'}), 400
+    if not isinstance(data, dict):
+        record_error('validation', 'NotAnObject')
+        return jsonify({'error': 'Request body must be a JSON object', 'status': 'error'}), 400
     
     try:
-        validate_predict_input(data)
+        with stage('validate'):
+            validate_predict_input(data)
         result = prediction_service.predict(data)
         return result
     except ValueError as e:
+        record_error('validation', e)
         return jsonify({'error': str(e), 'status': 'error'}), 400
 
+@app.route('/predict/batch', methods=['POST'])
+@error_handler
+def predict_batch():
+    """API endpoint for price predictions on many houses in one request"""
+    with stage('batch_json_parse'):
+        data = request.get_json()
+    if not isinstance(data, dict) or not isinstance(data.get('houses'), list):
+        return jsonify({'error': 'Request must contain a list of houses', 'status': 'error'}), 400
+    
+    houses = data['houses']
+    if len(houses) > MAX_BATCH_SIZE:
+        return jsonify({
+            'error': f"Batch too large: at most {MAX_BATCH_SIZE} houses per request",
+            'status': 'error'
+        }), 400
+    
+    # Validate every house up front; only valid ones reach the model
+    results = [None] * len(houses)
+    valid_items = []
+    valid_positions = []
+    with stage('batch_validate'):
+        for i, house in enumerate(houses):
+            try:
+                if not isinstance(house, dict):
+                    raise ValueError("Invalid input data: each house must be an object")
+                validate_predict_input(house)
+                valid_items.append(house)
+                valid_positions.append(i)
+            except ValueError as e:
+                record_error('validation', e)
+                results[i] = {'status': 'error', 'error': str(e)}
+    
+    for i, result in zip(valid_positions, prediction_service.predict_many(valid_items)):
+        results[i] = result
+    
+    succeeded = sum(1 for result in results if result['status'] == 'success')
+    with stage('batch_jsonify'):
+        return jsonify({
+            'status': 'success',
+            'count': len(results),
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded,
+            'results': results
+        })
+
+@app.route('/predict/sweep', methods=['POST'])
+@error_handler
+def predict_sweep():
+    """API endpoint for a what-if price curve over one or more varied fields"""
+    with stage('sweep_json_parse'):
+        data = request.get_json()
+    if not isinstance(data, dict):
+        record_error('validation', 'NoData')
+        return jsonify({'error': 'No data provided', 'status': 'error'}), 400
+    
+    try:
+        with stage('sweep_validate'):
+            validate_sweep_input(data, MAX_SWEEP_POINTS, prediction_service.sweep_categories())
+        result = prediction_service.sweep(data['house'], data['sweep'], MAX_SWEEP_POINTS)
+    except ValueError as e:
+        record_error('validation', e)
+        return jsonify({'error': str(e), 'status': 'error'}), 400
+    except RuntimeError as e:
+        record_error('prediction', e)
+        return jsonify({'error': f"Failed to process prediction: {str(e)}", 'status': 'error'}), 500
+    
+    with stage('sweep_jsonify'):
+        response = jsonify(result)
+    if result['modelVersion'] is not None:
+        response.headers['X-Model-Version'] = str(result['modelVersion'])
+    return response
+
+def admin_required(f):
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            return jsonify({'error': 'Admin endpoints are disabled', 'status': 'error'}), 404
+        # Constant-time comparison so response timing does not leak the token
+        supplied = request.headers.get('Authorization', '').encode()
+        if not hmac.compare_digest(supplied, f"Bearer {ADMIN_TOKEN}".encode()):
+            return jsonify({'error': 'Unauthorized', 'status': 'error'}), 401
+        return f(*args, **kwargs)
+    return wrapper
+
+@app.route('/admin/reload', methods=['POST'])
+@error_handler
+@admin_required
+def admin_reload():
+    """Load a registry version (the active one by default) and swap it in"""
+    if reloader is None:
+        return jsonify({'error': 'No model registry configured', 'status': 'error'}), 400
+    
+    data = request.get_json(silent=True) or {}
+    wait = bool(data.get('wait', False))
+    if not reloader.reload(data.get('version'), wait=wait):
+        return jsonify({'error': 'A reload is already in progress', 'status': 'error',
+                        'reload': reloader.status()}), 409
+    
+    status = reloader.status()
+    if status['state'] == 'failed':
+        return jsonify({'error': status['last_error'], 'status': 'error', 'reload': status}), 500
+    return jsonify({'status': 'success', 'reload': status}), 200 if wait else 202
+
+@app.route('/admin/model', methods=['GET'])
+@error_handler
+@admin_required
+def admin_model():
+    """Version being served, registry contents and the last reload"""
+    info = {'status': 'success', 'model_version': prediction_service.model_version}
+    if reloader is not None:
+        info['reload'] = reloader.status()
+        info['registry'] = reloader.registry.read_manifest()
+    return jsonify(info)
+
+@app.route('/admin/profiling', methods=['GET', 'POST'])
+@error_handler
+@admin_required
+def admin_profiling():
+    """Show or change the share of requests profiled, e.g. {"rate": 0.01}"""
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        try:
+            profiler.rate = data.get('rate', profiler.rate)
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e), 'status': 'error'}), 400
+    return jsonify({'status': 'success', 'profiling': profiler.stats()})
+
+@app.route('/metrics', methods=['GET'])
+@error_handler
+def metrics():
+    """Prometheus metrics: stage and request latency, errors, model and cache state"""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+def render_metrics():
+    """Refresh the model, cache and batcher gauges and render every metric"""
+    MODEL_INFO.clear()
+    MODEL_INFO.labels(prediction_service.model_version).set(1)
+    cache = prediction_service.cache
+    if cache is not None:
+        stats = cache.stats()
+        CACHE_ENTRIES.set(stats['size'])
+        for event in ('hits', 'misses', 'evictions', 'expirations', 'invalidations'):
+            CACHE_EVENTS.labels(event).set(stats[event])
+    batcher = prediction_service.batcher
+    if batcher is not None:
+        stats = batcher.stats()
+        MICRO_BATCHES.set(stats['batches'])
+        MICRO_BATCH_ROWS.set(stats['rows'])
+    return REGISTRY.render()
+
 @app.route('/health', methods=['GET'])
 @error_handler
 def health_check():
     """Health check endpoint"""
-    return jsonify({
+    return jsonify(health_status())
+
+def health_status():
+    """Payload of /health, shared with the ASGI entry point"""
+    health = {
         'status': 'healthy',
-        'model_loaded': prediction_service is not None
-    })
+        'model_loaded': prediction_service is not None,
+        'model_version': prediction_service.model_version
+    }
+    if prediction_service.cache is not None:
+        health['cache'] = prediction_service.cache.stats()
+    if prediction_service.batcher is not None:
+        health['micro_batching'] = prediction_service.batcher.stats()
+    return health
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
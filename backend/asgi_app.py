@@ -0,0 +1,221 @@
+"""
+ASGI entry point for the prediction API.
+
+Serves the same /predict, /health and /metrics contract as app.py, with the
+same CORS policy and the same PredictionService (and so the same model,
+registry watcher, cache and micro-batching settings). Requests are parsed
+and validated on the event loop, and only inference runs in a bounded
+thread pool. Slow clients therefore cost a coroutine rather than a worker
+thread.
+
+When more than HOUSEWISE_ASGI_MAX_PENDING predictions are queued or running,
+new ones are rejected at once with 503 and Retry-After, instead of waiting in
+an unbounded queue.
+
+Usage:
+    uvicorn asgi_app:application --host 0.0.0.0 --port 5000 --workers 2
+"""
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import app as flask_app
+from metrics import record_error, stage
+from validation import validate_predict_input
+
+# Threads running inference per process
+INFERENCE_WORKERS = int(os.environ.get('HOUSEWISE_ASGI_INFERENCE_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+# Predictions queued or running before new ones get 503
+MAX_PENDING = int(os.environ.get('HOUSEWISE_ASGI_MAX_PENDING', '64'))
+
+# Largest accepted request body
+MAX_BODY_BYTES = 64 * 1024
+
+RETRY_AFTER_SECONDS = 1
+
+
+def _json_body(payload):
+    # Same bytes as Flask's jsonify: sorted keys, compact separators, trailing newline
+    return (json.dumps(payload, sort_keys=True, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+class _BodyTooLarge(Exception):
+    pass
+
+
+class PredictionASGI:
+    def __init__(self, service, cors_policy, inference_workers=INFERENCE_WORKERS, max_pending=MAX_PENDING):
+        """
+        Args:
+            service: PredictionService scoring the requests
+            cors_policy: flask-cors style resource options (see app.CORS_POLICY)
+            inference_workers: Threads in the inference pool
+            max_pending: Predictions queued or running before 503s
+        """
+        if inference_workers < 1:
+            raise ValueError("inference_workers must be at least 1")
+        if max_pending < 1:
+            raise ValueError("max_pending must be at least 1")
+        self.service = service
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=inference_workers, thread_name_prefix='inference')
+        # Only touched from the event loop, so no lock is needed
+        self.pending = 0
+        self.rejected = 0
+
+        self._origins = set(cors_policy['origins'])
+        self._allow_headers = {header.lower() for header in cors_policy['allow_headers']}
+        self._cors_headers = [(b'access-control-expose-headers', ', '.join(cors_policy['expose_headers']).encode())]
+        if cors_policy.get('supports_credentials'):
+            self._cors_headers.append((b'access-control-allow-credentials', b'true'))
+        self._preflight_headers = [
+            (b'access-control-allow-methods', ', '.join(sorted(cors_policy['methods'])).encode()),
+            (b'access-control-max-age', str(cors_policy['max_age']).encode()),
+        ]
+
+        self._routes = {
+            '/predict': ('predict', {'POST': self._predict}),
+            '/health': ('health_check', {'GET': self._health}),
+            '/metrics': ('metrics', {'GET': self._metrics}),
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        start = time.perf_counter()
+        method = scope['method']
+        headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+        endpoint, handlers = self._routes.get(scope['path'], ('unmatched', {}))
+
+        origin = headers.get('origin')
+        extra_headers = []
+        if origin in self._origins:
+            extra_headers = [(b'access-control-allow-origin', origin.encode('latin-1')), (b'vary', b'Origin')]
+            extra_headers += self._cors_headers
+
+        try:
+            if method == 'OPTIONS' and handlers:
+                status, body, content_type = 200, b'', b'text/html; charset=utf-8'
+                allow = ', '.join(sorted(set(handlers) | {'OPTIONS'}))
+                extra_headers.append((b'allow', allow.encode()))
+                if origin in self._origins and 'access-control-request-method' in headers:
+                    extra_headers += self._preflight(headers)
+            elif method in handlers:
+                status, body, content_type, response_headers = await handlers[method](receive)
+                extra_headers += response_headers
+            elif handlers:
+                status, body, content_type = 405, _json_body({'error': 'Method not allowed', 'status': 'error'}), b'application/json'
+            else:
+                status, body, content_type = 404, _json_body({'error': 'Not found', 'status': 'error'}), b'application/json'
+        except _BodyTooLarge:
+            record_error('validation', 'BodyTooLarge')
+            status, body, content_type = 413, _json_body({'error': 'Request body too large', 'status': 'error'}), b'application/json'
+        except Exception as e:
+            record_error('internal', e)
+            self.service.logger.error(f"Error: {str(e)}")
+            status, body, content_type = 500, _json_body({'error': str(e), 'status': 'error'}), b'application/json'
+
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', content_type), (b'content-length', str(len(body)).encode())] + extra_headers
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+        flask_app.REQUEST_SECONDS.labels(endpoint).observe(time.perf_counter() - start)
+        flask_app.REQUESTS.labels(endpoint, method, str(status)).inc()
+
+    def _preflight(self, headers):
+        requested = [header.strip() for header in headers.get('access-control-request-headers', '').split(',')]
+        allowed = ', '.join(header for header in requested if header.lower() in self._allow_headers)
+        preflight = list(self._preflight_headers)
+        if allowed:
+            preflight.append((b'access-control-allow-headers', allowed.encode('latin-1')))
+        return preflight
+
+    async def _read_body(self, receive):
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > MAX_BODY_BYTES:
+                raise _BodyTooLarge()
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                break
+        return b''.join(chunks)
+
+    def _error(self, status, message, headers=()):
+        return status, _json_body({'error': message, 'status': 'error'}), b'application/json', list(headers)
+
+    async def _predict(self, receive):
+        body = await self._read_body(receive)
+        with stage('json_parse'):
+            try:
+                data = json.loads(body) if body else None
+            except ValueError as e:
+                record_error('validation', e)
+                return self._error(400, f"Invalid JSON: {str(e)}")
+        if not data:
+            record_error('validation', 'NoData')
+            return self._error(400, 'No data provided')
+        if not isinstance(data, dict):
+            record_error('validation', 'NotAnObject')
+            return self._error(400, 'Request body must be a JSON object')
+
+        try:
+            with stage('validate'):
+                validate_predict_input(data)
+        except ValueError as e:
+            record_error('validation', e)
+            return self._error(400, str(e))
+
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            record_error('overload', 'QueueFull')
+            return self._error(503, 'Server is busy, retry shortly',
+                               [(b'retry-after', str(RETRY_AFTER_SECONDS).encode())])
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            payload, status, model_version = await loop.run_in_executor(self.executor, self.service.predict_payload, data)
+        finally:
+            self.pending -= 1
+
+        with stage('jsonify'):
+            body = _json_body(payload)
+        headers = [] if model_version is None else [(b'x-model-version', str(model_version).encode())]
+        return status, body, b'application/json', headers
+
+    async def _health(self, receive):
+        health = flask_app.health_status()
+        health['executor'] = {'pending': self.pending, 'max_pending': self.max_pending, 'rejected': self.rejected}
+        return 200, _json_body(health), b'application/json', []
+
+    async def _metrics(self, receive):
+        return 200, flask_app.render_metrics().encode('utf-8'), b'text/plain; version=0.0.4', []
+
+
+application = PredictionASGI(flask_app.prediction_service, flask_app.CORS_POLICY)
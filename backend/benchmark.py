@@ -0,0 +1,585 @@
+"""
+Reproducible benchmark and load-test suite for the backend.
+
+Every run works in a fresh workspace directory. The model there is trained by
+load_or_train_model from the seeded synthetic data, so results do not depend
+on whichever model.joblib happens to be checked out. Request inputs come from
+generate_synthetic_data. Cold starts, worker memory and the real HTTP server
+run in subprocesses, so each one measures a fresh interpreter.
+
+Sections:
+    cold_start  load_or_train_model on the train and load paths, and a flat artifact load
+    single      PredictionService.predict latency percentiles, one row at a time
+    batch       PredictionService.predict_many throughput at several batch sizes
+    client      /predict through the Flask test client
+    server      /predict through a threaded werkzeug server with N concurrent clients
+    server_asgi The same load against asgi_app.py under uvicorn (if installed)
+    rss         Memory of an app worker (joblib model and flat artifact)
+    reload      /predict under load while /admin/reload swaps the model
+
+Usage:
+    python benchmark.py run --output results.json
+    python benchmark.py run --sections single batch --baseline baseline.json
+    python benchmark.py compare baseline.json results.json --threshold 0.15
+"""
+import argparse
+import datetime
+import http.client
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from data_generator import generate_synthetic_data
+from validation import FIELD_COLUMNS
+
+SECTIONS = ['cold_start', 'single', 'batch', 'client', 'server', 'server_asgi', 'rss', 'reload']
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+ADMIN_TOKEN = 'benchmark'
+
+# Keep repeated inputs from being served out of the prediction cache
+BENCHMARK_ENV = {'HOUSEWISE_CACHE_SIZE': '0'}
+
+
+def synthetic_requests(n_samples):
+    """/predict request bodies built from generate_synthetic_data rows"""
+    return request_bodies(generate_synthetic_data(n_samples).drop(columns='price'))
+
+
+def request_bodies(frame):
+    """/predict request bodies built from rows of a raw feature frame"""
+    columns = {snake: camel for camel, snake in FIELD_COLUMNS.items()}
+    requests = []
+    for record in frame.to_dict('records'):
+        body = {columns[name]: value for name, value in record.items()}
+        body['hasGarage'] = bool(body['hasGarage'])
+        body['hasPool'] = bool(body['hasPool'])
+        requests.append({name: value.item() if hasattr(value, 'item') else value for name, value in body.items()})
+    return requests
+
+
+def percentiles(latencies_ms):
+    """p50/p90/p99/mean of a list of latencies in milliseconds"""
+    p50, p90, p99 = np.percentile(latencies_ms, [50, 90, 99])
+    return {'p50_ms': float(p50), 'p90_ms': float(p90), 'p99_ms': float(p99), 'mean_ms': float(np.mean(latencies_ms))}
+
+
+def memory_usage():
+    """Current, peak and private (unshared) memory of this process in MB"""
+    usage = {}
+    try:
+        # Unix only; ru_maxrss survives fork and exec, so a child would report
+        # its parent's peak. VmHWM below replaces it where available.
+        import resource
+        usage['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    usage['rss_mb'] = int(line.split()[1]) / 1024
+                elif line.startswith('VmHWM:'):
+                    usage['peak_rss_mb'] = int(line.split()[1]) / 1024
+        with open('/proc/self/smaps_rollup') as f:
+            private = sum(int(line.split()[1]) for line in f if line.startswith(('Private_Clean:', 'Private_Dirty:')))
+        usage['private_mb'] = private / 1024
+    except OSError:
+        # Not Linux: only the peak is available
+        pass
+    return usage
+
+
+# Subprocess probes ------------------------------------------------------------
+
+def probe_cold_start(kind):
+    """Runs in a fresh interpreter inside the workspace; prints its timings as JSON"""
+    start = time.perf_counter()
+    if kind == 'artifact':
+        from prediction_service import PredictionService
+        imported = time.perf_counter()
+        PredictionService.from_artifact('model.hwf')
+    else:
+        from model_trainer import load_or_train_model
+        imported = time.perf_counter()
+        load_or_train_model()
+    done = time.perf_counter()
+    print(json.dumps({'import_seconds': imported - start, 'load_seconds': done - imported, **memory_usage()}))
+
+
+def probe_worker(n_requests):
+    """Import the app like a server worker would, serve n_requests, report memory"""
+    start = time.perf_counter()
+    import app as app_module
+    ready = time.perf_counter() - start
+    client = app_module.app.test_client()
+    for body in synthetic_requests(n_requests):
+        client.post('/predict', json=body)
+    print(json.dumps({'startup_seconds': ready, 'sklearn_imported': 'sklearn' in sys.modules, **memory_usage()}))
+
+
+def serve(port, kind='werkzeug'):
+    """Serve the app on a threaded werkzeug server, or the ASGI app on uvicorn, until killed"""
+    if kind == 'uvicorn':
+        import uvicorn
+        uvicorn.run('asgi_app:application', host='127.0.0.1', port=port, log_level='warning')
+        return
+    import logging
+    from werkzeug.serving import make_server
+    import app as app_module
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    make_server('127.0.0.1', port, app_module.app, threaded=True).serve_forever()
+
+
+def _run_probe(workspace, args, env=None):
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, os.path.join(BACKEND_DIR, 'benchmark.py'), '_probe', *args],
+        cwd=workspace, env=_subprocess_env(env), capture_output=True, text=True, check=True
+    )
+    measured = json.loads(result.stdout.strip().splitlines()[-1])
+    measured['wall_seconds'] = time.perf_counter() - start
+    return measured
+
+
+def _subprocess_env(extra=None):
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR, **BENCHMARK_ENV)
+    env.update(extra or {})
+    return env
+
+
+# Workspace --------------------------------------------------------------------
+
+class Workspace:
+    def __init__(self, path=None):
+        """Scratch directory holding the benchmark's own model files"""
+        self._owned = path is None
+        self.path = path or tempfile.mkdtemp(prefix='housewise-bench-')
+        self.model_path = os.path.join(self.path, 'model.joblib')
+        self.artifact_path = os.path.join(self.path, 'model.hwf')
+
+    def ensure_model(self):
+        """Train model.joblib (and convert it to model.hwf) unless already present"""
+        if not os.path.exists(self.model_path):
+            _run_probe(self.path, ['cold_start', 'train'])
+        if not os.path.exists(self.artifact_path):
+            from model_artifact import convert_joblib
+            convert_joblib(self.model_path, self.artifact_path)
+
+    def cleanup(self):
+        if self._owned:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+
+# Sections ---------------------------------------------------------------------
+
+def bench_cold_start(workspace, args):
+    """Train path once (empty workspace), then the load paths args.cold_repeats times each"""
+    results = {}
+    if not os.path.exists(workspace.model_path):
+        train = _run_probe(workspace.path, ['cold_start', 'train'])
+        results['cold_start.train.seconds'] = train['load_seconds']
+    workspace.ensure_model()
+
+    for kind in ('load', 'artifact'):
+        runs = [_run_probe(workspace.path, ['cold_start', kind]) for _ in range(args.cold_repeats)]
+        results[f'cold_start.{kind}.seconds'] = float(np.median([run['load_seconds'] for run in runs]))
+        results[f'cold_start.{kind}.import_seconds'] = float(np.median([run['import_seconds'] for run in runs]))
+        results[f'cold_start.{kind}.process_seconds'] = float(np.median([run['wall_seconds'] for run in runs]))
+    return results
+
+
+def _service(workspace):
+    from flask import Flask
+    from prediction_service import PredictionService
+    workspace.ensure_model()
+    service = PredictionService.from_file(workspace.model_path)
+    # predict() builds Flask responses, so it needs an application context
+    context = Flask(__name__).app_context()
+    context.push()
+    return service
+
+
+def bench_single(workspace, args):
+    service = _service(workspace)
+    bodies = synthetic_requests(args.requests)
+    for body in bodies[:50]:
+        service.predict(body)
+
+    latencies = []
+    for body in bodies:
+        start = time.perf_counter()
+        service.predict(body)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {f'single.{name}': value for name, value in percentiles(latencies).items()}
+
+
+def bench_batch(workspace, args):
+    service = _service(workspace)
+    bodies = synthetic_requests(max(args.batch_sizes))
+    results = {}
+    for size in args.batch_sizes:
+        items = bodies[:size]
+        service.predict_many(items)
+        repeats = max(3, min(50, 2000 // size))
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            service.predict_many(items)
+            timings.append(time.perf_counter() - start)
+        seconds = float(np.median(timings))
+        results[f'batch.{size}.ms'] = seconds * 1000
+        results[f'batch.{size}.rows_per_s'] = size / seconds
+    return results
+
+
+def bench_client(workspace, args):
+    workspace.ensure_model()
+    # app.py reads its configuration and model path at import time
+    os.environ.update(BENCHMARK_ENV)
+    os.chdir(workspace.path)
+    import app as app_module
+    client = app_module.app.test_client()
+    bodies = synthetic_requests(args.requests)
+    for body in bodies[:50]:
+        client.post('/predict', json=body)
+
+    latencies = []
+    errors = 0
+    start = time.perf_counter()
+    for body in bodies:
+        request_start = time.perf_counter()
+        errors += client.post('/predict', json=body).status_code != 200
+        latencies.append((time.perf_counter() - request_start) * 1000)
+    elapsed = time.perf_counter() - start
+    results = {f'client.{name}': value for name, value in percentiles(latencies).items()}
+    results['client.req_per_s'] = len(bodies) / elapsed
+    results['client.errors'] = errors
+    return results
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class _Server:
+    """The app on a threaded werkzeug server in a subprocess"""
+
+    def __init__(self, workspace, env=None, kind='werkzeug'):
+        self.port = _free_port()
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.join(BACKEND_DIR, 'benchmark.py'), '_serve', str(self.port), kind],
+            cwd=workspace.path, env=_subprocess_env(env),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        deadline = time.monotonic() + 120
+        while True:
+            try:
+                if self.request('GET', '/health')[0] == 200:
+                    break
+            except OSError:
+                pass
+            if self.process.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError("Benchmark server failed to start")
+            time.sleep(0.1)
+
+    def request(self, method, path, body=None, headers=None):
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=30)
+        try:
+            payload = None if body is None else json.dumps(body)
+            connection.request(method, path, payload, {'Content-Type': 'application/json', **(headers or {})})
+            response = connection.getresponse()
+            return response.status, response.getheader('X-Model-Version'), response.read()
+        finally:
+            connection.close()
+
+    def load(self, bodies, n_clients, duration, during=None):
+        """
+        Post bodies round-robin from n_clients threads for duration seconds.
+
+        Returns:
+            List of (start time, latency ms, status, model version) per request
+        """
+        records = []
+        stop = threading.Event()
+
+        def client(offset):
+            i = offset
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    status, version, _ = self.request('POST', '/predict', bodies[i % len(bodies)])
+                except OSError:
+                    status, version = 0, None
+                records.append((start, (time.perf_counter() - start) * 1000, status, version))
+                i += n_clients
+
+        threads = [threading.Thread(target=client, args=(offset,)) for offset in range(n_clients)]
+        for thread in threads:
+            thread.start()
+        if during is not None:
+            during()
+        time.sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        return records
+
+    def close(self):
+        self.process.terminate()
+        self.process.wait()
+
+
+def _load_test(workspace, args, prefix, kind):
+    workspace.ensure_model()
+    bodies = synthetic_requests(args.requests)
+    server = _Server(workspace, kind=kind)
+    results = {}
+    try:
+        server.load(bodies, 1, 1.0)
+        for n_clients in args.clients:
+            records = server.load(bodies, n_clients, args.duration)
+            # Percentiles and throughput of served predictions; fast 503s are counted apart
+            latencies = [latency for _, latency, status, _ in records if status == 200]
+            for name, value in percentiles(latencies).items():
+                results[f'{prefix}.c{n_clients}.{name}'] = value
+            results[f'{prefix}.c{n_clients}.req_per_s'] = len(latencies) / args.duration
+            results[f'{prefix}.c{n_clients}.errors'] = sum(status not in (200, 503) for _, _, status, _ in records)
+            results[f'{prefix}.c{n_clients}.rejected'] = sum(status == 503 for _, _, status, _ in records)
+    finally:
+        server.close()
+    return results
+
+
+def bench_server(workspace, args):
+    return _load_test(workspace, args, 'server', 'werkzeug')
+
+
+def bench_server_asgi(workspace, args):
+    try:
+        import uvicorn  # noqa: F401
+    except ImportError:
+        print("  uvicorn is not installed, skipping", file=sys.stderr)
+        return {}
+    return _load_test(workspace, args, 'server_asgi', 'uvicorn')
+
+
+def bench_rss(workspace, args):
+    workspace.ensure_model()
+    results = {}
+    for name, env in (('joblib', {}), ('artifact', {'HOUSEWISE_MODEL_ARTIFACT': workspace.artifact_path})):
+        worker = _run_probe(workspace.path, ['worker', '200'], env)
+        results[f'rss.{name}.startup_seconds'] = worker['startup_seconds']
+        for key in ('rss_mb', 'peak_rss_mb', 'private_mb'):
+            if key in worker:
+                results[f'rss.{name}.{key}'] = worker[key]
+    return results
+
+
+def bench_reload(workspace, args):
+    """Hammer /predict from the largest client count while the model is swapped"""
+    from model_registry import ModelRegistry
+    workspace.ensure_model()
+    registry_path = os.path.join(workspace.path, 'registry')
+    shutil.rmtree(registry_path, ignore_errors=True)
+    registry = ModelRegistry(registry_path)
+    registry.publish(workspace.model_path)
+    registry.publish(workspace.artifact_path, activate=False)
+
+    bodies = synthetic_requests(args.requests)
+    server = _Server(workspace, {'HOUSEWISE_MODEL_REGISTRY': registry_path, 'HOUSEWISE_ADMIN_TOKEN': ADMIN_TOKEN})
+    reload_at = []
+
+    def trigger():
+        time.sleep(args.duration / 3)
+        reload_at.append(time.perf_counter())
+        status, _, _ = server.request('POST', '/admin/reload', {'version': 'v0002'},
+                                      {'Authorization': f'Bearer {ADMIN_TOKEN}'})
+        if status != 202:
+            raise RuntimeError(f"/admin/reload returned {status}")
+
+    try:
+        records = server.load(bodies, max(args.clients), args.duration, during=trigger)
+    finally:
+        server.close()
+
+    # Equal-length windows before and after the trigger; one-off scheduler
+    # stalls dominate the p99 of anything much shorter
+    window = args.duration / 3
+    before = [latency for start, latency, _, _ in records if start < reload_at[0]]
+    during = [latency for start, latency, _, _ in records if reload_at[0] <= start < reload_at[0] + window]
+    versions = {version for _, _, _, version in records}
+    return {
+        'reload.errors': sum(status != 200 for _, _, status, _ in records),
+        'reload.before.p99_ms': percentiles(before)['p99_ms'],
+        'reload.during.p99_ms': percentiles(during)['p99_ms'],
+        'reload.during.max_ms': float(max(during)),
+        'reload.swapped': int(versions >= {'v0001', 'v0002'})
+    }
+
+
+BENCHMARKS = {
+    'cold_start': bench_cold_start,
+    'single': bench_single,
+    'batch': bench_batch,
+    'client': bench_client,
+    'server': bench_server,
+    'server_asgi': bench_server_asgi,
+    'rss': bench_rss,
+    'reload': bench_reload,
+}
+
+
+# Results and comparison -------------------------------------------------------
+
+def metric_direction(name):
+    """'higher' if a larger value is better for this metric, else 'lower'"""
+    return 'higher' if name.endswith(('per_s', '.swapped')) else 'lower'
+
+
+def environment_info():
+    from importlib import metadata
+    packages = {}
+    for package in ('numpy', 'pandas', 'scikit-learn', 'flask', 'werkzeug', 'joblib'):
+        try:
+            packages[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            packages[package] = None
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'commit': commit,
+        'packages': packages
+    }
+
+
+def run(args):
+    workspace = Workspace(args.workspace)
+    results = {}
+    # bench_client switches into the workspace so app.py finds its model
+    cwd = os.getcwd()
+    try:
+        for section in args.sections:
+            print(f"Running {section}...", file=sys.stderr)
+            start = time.perf_counter()
+            results.update(BENCHMARKS[section](workspace, args))
+            print(f"  done in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    finally:
+        os.chdir(cwd)
+        workspace.cleanup()
+
+    report = {
+        'environment': environment_info(),
+        'settings': {
+            'sections': args.sections, 'requests': args.requests, 'batch_sizes': args.batch_sizes,
+            'clients': args.clients, 'duration': args.duration, 'cold_repeats': args.cold_repeats
+        },
+        'results': results
+    }
+    for name, value in results.items():
+        print(f"{name:<40} {value:>12.3f}" if isinstance(value, float) else f"{name:<40} {value:>12}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved results to {args.output}", file=sys.stderr)
+    return report
+
+
+def compare(baseline, current, threshold=0.15):
+    """
+    Compare two result dicts metric by metric.
+
+    Returns:
+        List of (name, baseline value, current value, relative change, regressed)
+        for every metric present in both. A metric regresses when it moved in
+        the wrong direction by more than threshold (a share of the baseline).
+    """
+    rows = []
+    for name in sorted(set(baseline) & set(current)):
+        old, new = baseline[name], current[name]
+        if old == 0:
+            change = 0.0 if new == 0 else float('inf')
+        else:
+            change = (new - old) / abs(old)
+        worse = -change if metric_direction(name) == 'higher' else change
+        rows.append((name, old, new, change, worse > threshold))
+    return rows
+
+
+def print_comparison(rows):
+    print(f"{'metric':<40} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, old, new, change, regressed in rows:
+        flag = '  REGRESSION' if regressed else ''
+        print(f"{name:<40} {old:>12.3f} {new:>12.3f} {change:>+8.1%}{flag}")
+    regressions = sum(regressed for *_, regressed in rows)
+    print(f"\n{regressions} regression(s) in {len(rows)} metrics")
+    return regressions
+
+
+def _load_results(path):
+    with open(path) as f:
+        return json.load(f)['results']
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '_probe':
+        kind, arg = sys.argv[2], sys.argv[3]
+        return probe_cold_start(arg) if kind == 'cold_start' else probe_worker(int(arg))
+    if len(sys.argv) > 1 and sys.argv[1] == '_serve':
+        return serve(int(sys.argv[2]), sys.argv[3])
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Run the benchmarks')
+    run_parser.add_argument('--sections', nargs='+', choices=SECTIONS, default=SECTIONS)
+    run_parser.add_argument('--output', help='Write results to this JSON file')
+    run_parser.add_argument('--baseline', help='Compare against this saved results file')
+    run_parser.add_argument('--threshold', type=float, default=0.15, help='Relative change counted as a regression')
+    run_parser.add_argument('--requests', type=int, default=1000, help='Synthetic request bodies per latency test')
+    run_parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 10, 100, 1000])
+    run_parser.add_argument('--clients', type=int, nargs='+', default=[1, 4, 16], help='Concurrent HTTP clients')
+    run_parser.add_argument('--duration', type=float, default=5.0, help='Seconds per HTTP load test')
+    run_parser.add_argument('--cold-repeats', type=int, default=3, help='Fresh processes per cold-start path')
+    run_parser.add_argument('--workspace', help='Reuse this directory for model files instead of a temporary one')
+
+    compare_parser = subparsers.add_parser('compare', help='Compare two saved results files')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.15)
+    args = parser.parse_args()
+    # Sections may change the working directory; pin user paths to the one they were given in
+    for name in ('output', 'baseline', 'current', 'workspace'):
+        if getattr(args, name, None):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+
+    if args.command == 'run':
+        report = run(args)
+        if args.baseline:
+            print()
+            regressions = print_comparison(compare(_load_results(args.baseline), report['results'], args.threshold))
+            sys.exit(1 if regressions else 0)
+    else:
+        regressions = print_comparison(compare(_load_results(args.baseline), _load_results(args.current), args.threshold))
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
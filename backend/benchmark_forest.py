@@ -0,0 +1,58 @@
+"""
+Compare sklearn's RandomForestRegressor.predict with the FlatForest engine.
+
+Usage:
+    python benchmark_forest.py [--sizes 1 64 10000] [--repeats 20]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from data_generator import generate_synthetic_data
+from feature_plan import FeaturePlan
+from flat_forest import FlatForest
+from model_trainer import load_or_train_model
+
+
+def time_call(fn, X, repeats):
+    """Return per-call latencies in milliseconds after one warm-up call"""
+    fn(X)
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(X)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 64, 10000], help='Batch sizes to time')
+    parser.add_argument('--repeats', type=int, default=20, help='Timed calls per batch size')
+    args = parser.parse_args()
+
+    model, encoder, scaler, cat_cols, num_cols = load_or_train_model()
+    plan = FeaturePlan.from_fitted(encoder, scaler, cat_cols, num_cols)
+
+    start = time.perf_counter()
+    forest = FlatForest.from_sklearn(model)
+    print(f"Flattened {forest.n_trees} trees ({len(forest.value):,} nodes, depth {forest.max_depth}) "
+          f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    data = generate_synthetic_data(max(args.sizes)).drop('price', axis=1)
+    X = plan.transform_many(data.to_dict('records'))
+
+    max_diff = np.abs(model.predict(X) - forest.predict(X)).max()
+    print(f"Max |sklearn - flat| over {len(X):,} rows: {max_diff:.3g}")
+
+    print(f"\n{'batch':>7} {'engine':>8} {'p50 ms':>9} {'p99 ms':>9} {'rows/s':>11}")
+    for size in args.sizes:
+        for name, fn in (('sklearn', model.predict), ('flat', forest.predict)):
+            latencies = time_call(fn, X[:size], args.repeats)
+            p50, p99 = np.percentile(latencies, [50, 99])
+            print(f"{size:>7} {name:>8} {p50:>9.3f} {p99:>9.3f} {size / p50 * 1000:>11,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+"""
+Offline bulk scoring of house portfolios.
+
+Reads houses from a CSV file, a Parquet file (requires pyarrow) or a chunked
+dataset directory written by data_generator.py. Columns may use the camelCase
+request names or the snake_case training names. Rows are streamed in bounded
+chunks, validated with the vectorized rules of validation.validate_frame and
+scored as one matrix per chunk across a worker pool. Memory stays flat no
+matter how large the input is.
+
+Usage:
+    python bulk_score.py houses.csv predictions.csv --model model.hwf --jobs 4
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from data_generator import MANIFEST_NAME, iter_dataset_chunks
+from prediction_service import PredictionService
+from validation import validate_frame
+
+OUTPUT_COLUMNS = ['row', 'predicted_price', 'price_lower', 'price_upper', 'confidence', 'error']
+
+# Per-process service, created once by _init_worker
+_service = None
+
+
+def load_service(model_path=None, confidence_mode='forest'):
+    """
+    Build a PredictionService from a flat artifact (.hwf) or a joblib model.
+
+    Without a path, the model is loaded the same way app.py does it.
+    """
+    if model_path:
+        return PredictionService.from_file(model_path, confidence_mode=confidence_mode)
+
+    from model_trainer import load_or_train_model
+    model, encoder, scaler, cat_cols, num_cols = load_or_train_model()
+    return PredictionService(model, encoder, scaler, cat_cols, num_cols, confidence_mode=confidence_mode)
+
+
+def _init_worker(model_path, confidence_mode):
+    global _service
+    _service = load_service(model_path, confidence_mode)
+
+
+def score_chunk(first_row, frame, id_column=None):
+    """
+    Validate and score one chunk.
+
+    Args:
+        first_row: Input row number of the chunk's first row
+        frame: Raw input chunk
+        id_column: Optional input column copied to the output
+
+    Returns:
+        DataFrame with OUTPUT_COLUMNS (plus id_column) per input row
+    """
+    parsed, errors = validate_frame(frame)
+    n_rows = len(frame)
+    output = pd.DataFrame({
+        'row': np.arange(first_row, first_row + n_rows),
+        'predicted_price': np.nan,
+        'price_lower': np.nan,
+        'price_upper': np.nan,
+        'confidence': np.nan,
+        'error': errors
+    })
+    if id_column:
+        output.insert(1, id_column, frame[id_column].to_numpy())
+
+    valid = pd.isnull(errors)
+    if valid.any():
+        scored = _service.score_frame(parsed[valid])
+        for name in ('predicted_price', 'price_lower', 'price_upper', 'confidence'):
+            output.loc[valid, name] = scored[name]
+        output.loc[valid, 'error'] = scored['error']
+    return output
+
+
+def iter_input_chunks(path, chunk_size):
+    """Yield raw DataFrame chunks of at most chunk_size rows from a supported input"""
+    if os.path.isdir(path) and os.path.exists(os.path.join(path, MANIFEST_NAME)):
+        for part in iter_dataset_chunks(path):
+            for start in range(0, len(part), chunk_size):
+                yield part.iloc[start:start + chunk_size].drop(columns='price', errors='ignore')
+    elif path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    elif path.endswith(('.csv', '.csv.gz')):
+        yield from pd.read_csv(path, chunksize=chunk_size)
+    else:
+        raise ValueError(f"Unsupported input {path}: expected .csv, .parquet or a dataset directory")
+
+
+class _OutputWriter:
+    """Append scored chunks to a CSV or Parquet file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._parquet = None
+        self._header = True
+        if not path.endswith(('.csv', '.parquet')):
+            raise ValueError(f"Unsupported output {path}: expected .csv or .parquet")
+
+    def write(self, frame):
+        if self.path.endswith('.parquet'):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+        else:
+            frame.to_csv(self.path, mode='w' if self._header else 'a', header=self._header, index=False)
+            self._header = False
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def score_file(input_path, output_path, model_path=None, chunk_size=100_000, n_jobs=1,
+               id_column=None, confidence_mode='forest', log=sys.stderr):
+    """
+    Score every house in input_path and write the results to output_path.
+
+    At most 2 * n_jobs chunks are in flight, so memory is bounded by chunk_size
+    rather than by the input size.
+
+    Returns:
+        dict with rows, failed rows, seconds and rows_per_second
+    """
+    writer = _OutputWriter(output_path)
+    chunks = iter_input_chunks(input_path, chunk_size)
+    rows = failed = 0
+    start = time.perf_counter()
+
+    def record(output):
+        nonlocal rows, failed
+        writer.write(output)
+        rows += len(output)
+        failed += int(output['error'].notna().sum())
+        elapsed = time.perf_counter() - start
+        print(f"{rows:,} rows scored ({failed:,} failed), {rows / elapsed:,.0f} rows/s", file=log)
+
+    try:
+        if n_jobs == 1:
+            _init_worker(model_path, confidence_mode)
+            first_row = 0
+            for frame in chunks:
+                record(score_chunk(first_row, frame, id_column))
+                first_row += len(frame)
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                     initargs=(model_path, confidence_mode)) as executor:
+                pending = []
+                first_row = 0
+                for frame in chunks:
+                    pending.append(executor.submit(score_chunk, first_row, frame, id_column))
+                    first_row += len(frame)
+                    if len(pending) >= 2 * n_jobs:
+                        record(pending.pop(0).result())
+                for future in pending:
+                    record(future.result())
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        'rows': rows,
+        'failed': failed,
+        'seconds': elapsed,
+        'rows_per_second': rows / elapsed if elapsed else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help='Input .csv, .parquet or dataset directory')
+    parser.add_argument('output', help='Output .csv or .parquet')
+    parser.add_argument('--model', help='Flat artifact (.hwf) or joblib model; defaults to the app model')
+    parser.add_argument('--chunk-size', type=int, default=100_000, help='Rows per chunk')
+    parser.add_argument('--jobs', type=int, default=1, help='Worker processes')
+    parser.add_argument('--id-column', help='Input column to copy to the output')
+    parser.add_argument('--confidence-mode', choices=['forest', 'heuristic'], default='forest')
+    args = parser.parse_args()
+
+    summary = score_file(
+        args.input, args.output, model_path=args.model, chunk_size=args.chunk_size,
+        n_jobs=args.jobs, id_column=args.id_column, confidence_mode=args.confidence_mode
+    )
+    print(f"Scored {summary['rows']:,} rows ({summary['failed']:,} failed) in {summary['seconds']:.1f}s "
+          f"({summary['rows_per_second']:,.0f} rows/s) -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
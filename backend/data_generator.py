@@ -1,80 +1,294 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
 import pandas as pd
 
-def generate_synthetic_data(n_samples=1000):
+NEIGHBORHOODS = ['downtown', 'midtown', 'uptown', 'suburbanNorth', 'suburbanSouth', 'suburbanEast', 'suburbanWest']
+CONDITIONS = ['poor', 'fair', 'good', 'excellent']
+BATHROOM_OPTIONS = [1, 1.5, 2, 2.5, 3, 3.5, 4, 4.5, 5]
+
+CONDITION_MULTIPLIERS = {'poor': 0.8, 'fair': 0.9, 'good': 1.0, 'excellent': 1.2}
+NEIGHBORHOOD_MULTIPLIERS = {
+    'downtown': 1.3,
+    'midtown': 1.2,
+    'uptown': 1.1,
+    'suburbanNorth': 1.05,
+    'suburbanSouth': 0.95,
+    'suburbanEast': 1.0,
+    'suburbanWest': 1.1
+}
+
+COLUMNS = [
+    'bedrooms', 'bathrooms', 'square_feet', 'lot_size', 'year_built',
+    'neighborhood', 'condition', 'has_garage', 'has_pool', 'price'
+]
+
+# Fixed-width dtypes used for record arrays and on-disk chunks
+RECORD_DTYPE = np.dtype([
+    ('bedrooms', np.int64),
+    ('bathrooms', np.float64),
+    ('square_feet', np.int64),
+    ('lot_size', np.float64),
+    ('year_built', np.int64),
+    ('neighborhood', f"U{max(map(len, NEIGHBORHOODS))}"),
+    ('condition', f"U{max(map(len, CONDITIONS))}"),
+    ('has_garage', np.int64),
+    ('has_pool', np.int64),
+    ('price', np.float64)
+])
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def _price_houses(features, noise):
     """
-    Generate synthetic housing data for model training.
-    
+    Apply the pricing formula to generated features.
+
     Args:
-        n_samples: Number of samples to generate
-        
+        features: Dict of feature arrays keyed by column name
+        noise: Multiplicative noise per house
+
     Returns:
-        DataFrame with synthetic housing data
+        numpy array of prices
     """
-    np.random.seed(42)
-    
-    # Generate features
-    bedrooms = np.random.randint(1, 7, n_samples)
-    bathrooms = np.random.choice([1, 1.5, 2, 2.5, 3, 3.5, 4, 4.5, 5], n_samples)
-    square_feet = np.random.randint(800, 5000, n_samples)
-    lot_size = np.random.uniform(0.1, 2.0, n_samples)
-    year_built = np.random.randint(1950, 2023, n_samples)
-    neighborhoods = ['downtown', 'midtown', 'uptown', 'suburbanNorth', 'suburbanSouth', 'suburbanEast', 'suburbanWest']
-    neighborhood = np.random.choice(neighborhoods, n_samples)
-    conditions = ['poor', 'fair', 'good', 'excellent']
-    condition = np.random.choice(conditions, n_samples)
-    has_garage = np.random.choice([0, 1], n_samples)
-    has_pool = np.random.choice([0, 1], n_samples)
-    
+    n_samples = len(noise)
+    condition = features['condition']
+    neighborhood = features['neighborhood']
+
     # Base price calculation
-    base_price = 200000 + 150 * square_feet
-    
+    base_price = 200000 + 150 * features['square_feet']
+
     # Adjustments
-    bedroom_adj = 15000 * (bedrooms - 3)
-    bathroom_adj = 20000 * (bathrooms - 2)
-    age_adj = -1000 * (2023 - year_built)
-    lot_adj = 50000 * lot_size
-    
+    bedroom_adj = 15000 * (features['bedrooms'] - 3)
+    bathroom_adj = 20000 * (features['bathrooms'] - 2)
+    age_adj = -1000 * (2023 - features['year_built'])
+    lot_adj = 50000 * features['lot_size']
+
     # Condition multipliers
     condition_mult = np.ones(n_samples)
-    condition_mult[condition == 'poor'] = 0.8
-    condition_mult[condition == 'fair'] = 0.9
-    condition_mult[condition == 'good'] = 1.0
-    condition_mult[condition == 'excellent'] = 1.2
-    
+    for name, mult in CONDITION_MULTIPLIERS.items():
+        condition_mult[condition == name] = mult
+
     # Neighborhood multipliers
     neighborhood_mult = np.ones(n_samples)
-    neighborhood_mult[neighborhood == 'downtown'] = 1.3
-    neighborhood_mult[neighborhood == 'midtown'] = 1.2
-    neighborhood_mult[neighborhood == 'uptown'] = 1.1
-    neighborhood_mult[neighborhood == 'suburbanNorth'] = 1.05
-    neighborhood_mult[neighborhood == 'suburbanSouth'] = 0.95
-    neighborhood_mult[neighborhood == 'suburbanEast'] = 1.0
-    neighborhood_mult[neighborhood == 'suburbanWest'] = 1.1
-    
+    for name, mult in NEIGHBORHOOD_MULTIPLIERS.items():
+        neighborhood_mult[neighborhood == name] = mult
+
     # Features
-    garage_adj = has_garage * 25000
-    pool_adj = has_pool * 40000
-    
+    garage_adj = features['has_garage'] * 25000
+    pool_adj = features['has_pool'] * 40000
+
     # Calculate price
     price = (base_price + bedroom_adj + bathroom_adj + age_adj + lot_adj + garage_adj + pool_adj) * condition_mult * neighborhood_mult
-    
+
     # Add some noise
-    price = price * np.random.normal(1, 0.1, n_samples)
-    
+    return price * noise
+
+
+def generate_synthetic_data(n_samples=1000):
+    """
+    Generate synthetic housing data for model training.
+
+    Args:
+        n_samples: Number of samples to generate
+
+    Returns:
+        DataFrame with synthetic housing data
+    """
+    np.random.seed(42)
+
+    # Generate features
+    features = {
+        'bedrooms': np.random.randint(1, 7, n_samples),
+        'bathrooms': np.random.choice(BATHROOM_OPTIONS, n_samples),
+        'square_feet': np.random.randint(800, 5000, n_samples),
+        'lot_size': np.random.uniform(0.1, 2.0, n_samples),
+        'year_built': np.random.randint(1950, 2023, n_samples),
+        'neighborhood': np.random.choice(NEIGHBORHOODS, n_samples),
+        'condition': np.random.choice(CONDITIONS, n_samples),
+        'has_garage': np.random.choice([0, 1], n_samples),
+        'has_pool': np.random.choice([0, 1], n_samples)
+    }
+
+    # Calculate price
+    features['price'] = _price_houses(features, np.random.normal(1, 0.1, n_samples))
+
     # Create DataFrame
-    data = pd.DataFrame({
-        'bedrooms': bedrooms,
-        'bathrooms': bathrooms,
-        'square_feet': square_feet,
-        'lot_size': lot_size,
-        'year_built': year_built,
-        'neighborhood': neighborhood,
-        'condition': condition,
-        'has_garage': has_garage,
-        'has_pool': has_pool,
-        'price': price
-    })
-    
-    return data
+    return pd.DataFrame(features)
+
+
+def _generate_chunk(seed_sequence, n_samples, as_records=False):
+    """Generate one chunk from its own random stream"""
+    rng = np.random.Generator(np.random.PCG64(seed_sequence))
+    features = {
+        'bedrooms': rng.integers(1, 7, n_samples),
+        'bathrooms': rng.choice(BATHROOM_OPTIONS, n_samples),
+        'square_feet': rng.integers(800, 5000, n_samples),
+        'lot_size': rng.uniform(0.1, 2.0, n_samples),
+        'year_built': rng.integers(1950, 2023, n_samples),
+        'neighborhood': rng.choice(NEIGHBORHOODS, n_samples),
+        'condition': rng.choice(CONDITIONS, n_samples),
+        'has_garage': rng.integers(0, 2, n_samples),
+        'has_pool': rng.integers(0, 2, n_samples)
+    }
+    features['price'] = _price_houses(features, rng.normal(1, 0.1, n_samples))
+
+    if as_records:
+        records = np.empty(n_samples, dtype=RECORD_DTYPE)
+        for name in COLUMNS:
+            records[name] = features[name]
+        return records
+    return pd.DataFrame(features)
+
+
+def _chunk_plan(n_samples, chunk_size, seed):
+    """Per-chunk (seed sequence, size); fixed by seed and chunk_size alone"""
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    n_chunks = -(-n_samples // chunk_size)
+    seed_sequences = np.random.SeedSequence(seed).spawn(n_chunks)
+    return [
+        (seed_sequences[i], min(chunk_size, n_samples - i * chunk_size))
+        for i in range(n_chunks)
+    ]
+
+
+def _run_chunks(fn, tasks, n_jobs):
+    """Run fn(*task) for every task in order, keeping at most 2 * n_jobs in flight"""
+    if n_jobs == 1:
+        for task in tasks:
+            yield fn(*task)
+        return
+
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        pending = []
+        for task in tasks:
+            pending.append(executor.submit(fn, *task))
+            if len(pending) >= 2 * n_jobs:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+def iter_synthetic_chunks(n_samples, chunk_size=1_000_000, seed=42, as_records=False, n_jobs=1):
+    """
+    Generate synthetic housing data in fixed-size chunks.
+
+    Every chunk draws from its own np.random.Generator spawned from one
+    SeedSequence, so the output depends only on n_samples, chunk_size and seed,
+    never on n_jobs. The pricing formula is the same as generate_synthetic_data.
+    Peak memory is bounded by chunk_size times the chunks in flight.
+
+    Args:
+        n_samples: Total number of samples to generate
+        chunk_size: Number of samples per chunk
+        seed: Root seed for the SeedSequence
+        as_records: Yield NumPy record arrays (RECORD_DTYPE) instead of DataFrames
+        n_jobs: Number of worker processes generating chunks in parallel
+
+    Yields:
+        DataFrame or record array per chunk, in order
+    """
+    tasks = [(seed_sequence, size, as_records) for seed_sequence, size in _chunk_plan(n_samples, chunk_size, seed)]
+    yield from _run_chunks(_generate_chunk, tasks, n_jobs)
+
+
+def _part_path(path, index, file_format):
+    return os.path.join(path, f"part-{index:05d}.{file_format}")
+
+
+def _write_chunk(seed_sequence, n_samples, part_path, file_format):
+    """Generate one chunk and write it straight to disk from the worker"""
+    if file_format == 'parquet':
+        _generate_chunk(seed_sequence, n_samples).to_parquet(part_path, index=False)
+    else:
+        records = _generate_chunk(seed_sequence, n_samples, as_records=True)
+        np.savez(part_path, **{name: records[name] for name in COLUMNS})
+    return n_samples
+
+
+def write_synthetic_dataset(path, n_samples, chunk_size=1_000_000, seed=42, n_jobs=1, file_format='npz'):
+    """
+    Generate a synthetic dataset directly to disk, one columnar file per chunk.
+
+    The directory holds part-NNNNN.npz files (one array per column) or, with
+    file_format='parquet', Parquet files (requires pyarrow), plus a manifest.
+
+    Args:
+        path: Output directory (created if missing)
+        n_samples: Total number of samples to generate
+        chunk_size: Number of samples per chunk
+        seed: Root seed for the SeedSequence
+        n_jobs: Number of worker processes generating chunks in parallel
+        file_format: 'npz' or 'parquet'
+
+    Returns:
+        The manifest dict
+    """
+    if file_format not in ('npz', 'parquet'):
+        raise ValueError(f"Unsupported file format: {file_format}")
+    os.makedirs(path, exist_ok=True)
+
+    plan = _chunk_plan(n_samples, chunk_size, seed)
+    tasks = [
+        (seed_sequence, size, _part_path(path, i, file_format), file_format)
+        for i, (seed_sequence, size) in enumerate(plan)
+    ]
+    for _ in _run_chunks(_write_chunk, tasks, n_jobs):
+        pass
+
+    manifest = {
+        'n_samples': n_samples,
+        'chunk_size': chunk_size,
+        'seed': seed,
+        'format': file_format,
+        'columns': COLUMNS,
+        'parts': [os.path.basename(task[2]) for task in tasks]
+    }
+    with open(os.path.join(path, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def iter_dataset_chunks(path):
+    """
+    Read back a dataset written by write_synthetic_dataset, one chunk at a time.
+
+    Yields:
+        DataFrame per part file, in order
+    """
+    with open(os.path.join(path, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+
+    for part in manifest['parts']:
+        part_path = os.path.join(path, part)
+        if manifest['format'] == 'parquet':
+            yield pd.read_parquet(part_path)
+        else:
+            with np.load(part_path) as columns:
+                yield pd.DataFrame({name: columns[name] for name in manifest['columns']})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write a chunked synthetic housing dataset to disk')
+    parser.add_argument('path', help='Output directory')
+    parser.add_argument('--n-samples', type=int, default=1_000_000, help='Total number of samples')
+    parser.add_argument('--chunk-size', type=int, default=1_000_000, help='Samples per chunk file')
+    parser.add_argument('--seed', type=int, default=42, help='Root seed')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='Worker processes')
+    parser.add_argument('--format', choices=['npz', 'parquet'], default='npz', help='Chunk file format')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    manifest = write_synthetic_dataset(args.path, args.n_samples, args.chunk_size, args.seed, args.jobs, args.format)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {args.n_samples:,} rows in {len(manifest['parts'])} parts to {args.path} "
+          f"in {elapsed:.1f}s ({args.n_samples / elapsed:,.0f} rows/s)")
+
+
+if __name__ == '__main__':
+    main()
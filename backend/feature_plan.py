@@ -0,0 +1,207 @@
+import numpy as np
+
+
+class FeaturePlan:
+    def __init__(self, cat_cols, num_cols, categories, mean, scale):
+        """
+        Precompiled preprocessing plan that maps a parsed house record straight
+        to the model's feature row, without building a DataFrame.
+
+        The layout matches ``np.hstack([scaler.transform(X[num_cols]),
+        encoder.transform(X[cat_cols])])`` exactly: scaled numerical features
+        first, then one column per category in encoder order.
+
+        Args:
+            cat_cols: List of categorical column names
+            num_cols: List of numerical column names
+            categories: Per categorical column, the list of known categories
+            mean: Per numerical column mean (None if the scaler does not center)
+            scale: Per numerical column scale (None if the scaler does not scale)
+        """
+        self.cat_cols = list(cat_cols)
+        self.num_cols = list(num_cols)
+        self.categories = [list(cats) for cats in categories]
+        self.mean = None if mean is None else np.asarray(mean, dtype=np.float64)
+        self.scale = None if scale is None else np.asarray(scale, dtype=np.float64)
+
+        n_num = len(self.num_cols)
+        self.n_features = n_num + sum(len(cats) for cats in self.categories)
+
+        # Category -> output column index, one lookup per categorical column
+        self._cat_lookups = []
+        offset = n_num
+        for col, cats in zip(self.cat_cols, self.categories):
+            self._cat_lookups.append((col, {cat: offset + i for i, cat in enumerate(cats)}))
+            offset += len(cats)
+
+        # Python floats give the same IEEE-754 results as the scaler's
+        # in-place ``X -= mean_; X /= scale_`` on float64 arrays
+        means = [0.0] * n_num if self.mean is None else [float(m) for m in self.mean]
+        scales = [1.0] * n_num if self.scale is None else [float(s) for s in self.scale]
+        self._num_params = list(zip(self.num_cols, means, scales))
+
+    @classmethod
+    def from_fitted(cls, encoder, scaler, cat_cols, num_cols):
+        """Build a plan from a fitted OneHotEncoder and StandardScaler"""
+        return cls(
+            cat_cols,
+            num_cols,
+            [list(cats) for cats in encoder.categories_],
+            getattr(scaler, 'mean_', None),
+            getattr(scaler, 'scale_', None),
+        )
+
+    def to_dict(self):
+        """Return the plan as JSON-serializable metadata"""
+        return {
+            'cat_cols': self.cat_cols,
+            'num_cols': self.num_cols,
+            'categories': [[str(cat) for cat in cats] for cats in self.categories],
+            'mean': None if self.mean is None else self.mean.tolist(),
+            'scale': None if self.scale is None else self.scale.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, metadata):
+        """Rebuild a plan from the output of to_dict"""
+        return cls(
+            metadata['cat_cols'],
+            metadata['num_cols'],
+            metadata['categories'],
+            metadata['mean'],
+            metadata['scale'],
+        )
+
+    def transform_row(self, row):
+        """
+        Turn one parsed record into a (1, n_features) float64 feature matrix.
+
+        Args:
+            row: Dictionary keyed by the snake_case column names
+
+        Returns:
+            numpy array of shape (1, n_features)
+        """
+        out = np.zeros((1, self.n_features))
+        x = out[0]
+        x[:len(self._num_params)] = [(row[col] - m) / s for col, m, s in self._num_params]
+        for col, lookup in self._cat_lookups:
+            idx = lookup.get(row[col])
+            if idx is not None:
+                x[idx] = 1.0
+        return out
+
+    def transform_many(self, rows):
+        """
+        Turn a list of parsed records into an (n_rows, n_features) float64 matrix.
+
+        Args:
+            rows: List of dictionaries keyed by the snake_case column names
+
+        Returns:
+            numpy array of shape (len(rows), n_features)
+        """
+        n_num = len(self.num_cols)
+        out = np.zeros((len(rows), self.n_features))
+        X_num = out[:, :n_num]
+        X_num[:] = [[row[col] for col in self.num_cols] for row in rows]
+        if self.mean is not None:
+            X_num -= self.mean
+        if self.scale is not None:
+            X_num /= self.scale
+
+        row_idx = np.arange(len(rows))
+        for col, lookup in self._cat_lookups:
+            cols = np.array([lookup.get(row[col], -1) for row in rows], dtype=np.intp)
+            known = cols >= 0
+            out[row_idx[known], cols[known]] = 1.0
+        return out
+
+    def transform_frame(self, frame, out=None):
+        """
+        Turn a DataFrame with the snake_case columns into a feature matrix,
+        column by column without per-row Python work.
+
+        Numerical columns are scaled in float64, exactly like transform_row,
+        before being stored, so a float32 ``out`` holds the same values the
+        model sees at serving time.
+
+        Args:
+            frame: DataFrame holding num_cols and cat_cols
+            out: Optional preallocated (len(frame), n_features) array to fill;
+                may be float32 and may be a view into a larger matrix
+
+        Returns:
+            The filled feature matrix (``out`` if given)
+        """
+        n_rows = len(frame)
+        if out is None:
+            out = np.zeros((n_rows, self.n_features))
+        else:
+            out[:, len(self.num_cols):] = 0
+
+        for j, (col, _, _) in enumerate(self._num_params):
+            values = frame[col].to_numpy(dtype=np.float64)
+            if self.mean is not None:
+                values = values - self.mean[j]
+            if self.scale is not None:
+                values = values / self.scale[j]
+            out[:, j] = values
+
+        row_idx = np.arange(n_rows)
+        for col, lookup in self._cat_lookups:
+            cols = frame[col].map(lookup).to_numpy(dtype=np.float64, na_value=-1).astype(np.intp)
+            known = cols >= 0
+            out[row_idx[known], cols[known]] = 1
+        return out
+
+    def grid_axes(self, row, axes):
+        """
+        Base feature row and per-axis column blocks for a what-if sweep of one
+        parsed record, in the form FlatForest.predict_grid takes.
+
+        Swept values are scaled exactly like transform_row, so every grid point
+        equals the feature row of the matching record.
+
+        Args:
+            row: Base record keyed by the snake_case column names
+            axes: List of (column, values) pairs; values in parsed types
+
+        Returns:
+            tuple: (base row of shape (n_features,), list of (columns, values)
+            pairs with values of shape (len(values), len(columns)))
+        """
+        base = self.transform_row(row)[0]
+        num_params = {col: (j, m, s) for j, (col, m, s) in enumerate(self._num_params)}
+        cat_lookups = dict(self._cat_lookups)
+
+        blocks = []
+        for col, values in axes:
+            if col in num_params:
+                j, m, s = num_params[col]
+                blocks.append(([j], np.array([[(value - m) / s] for value in values])))
+            else:
+                lookup = cat_lookups[col]
+                columns = list(lookup.values())
+                block = np.zeros((len(values), len(columns)))
+                for i, value in enumerate(values):
+                    idx = lookup.get(value)
+                    if idx is not None:
+                        block[i, idx - columns[0]] = 1.0
+                blocks.append((columns, block))
+        return base, blocks
+
+    def transform_grid(self, row, axes):
+        """
+        Feature matrix for every combination of the axes' values applied to
+        one parsed record (see grid_axes for the arguments).
+
+        Rows are in C order: the last axis varies fastest, so the scores
+        reshape to the axis lengths.
+        """
+        base, blocks = self.grid_axes(row, axes)
+        shape = [len(values) for _, values in blocks]
+        out = np.repeat(base[np.newaxis], int(np.prod(shape)), axis=0)
+        for (columns, values), idx in zip(blocks, np.indices(shape).reshape(len(shape), -1)):
+            out[:, columns] = values[idx]
+        return out
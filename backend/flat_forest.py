@@ -0,0 +1,298 @@
+import numpy as np
+
+
+class FlatForest:
+    # Rows scored per traversal pass; keeps the (tree, row) working set in cache
+    CHUNK_SIZE = 512
+
+    # Leaves summed per step by predict_grid; bounds its temporary arrays
+    GRID_CHUNK_SIZE = 2048
+
+    # Node arrays in the order they are persisted; the last two are derived
+    # from the others and stored so that loading needs no recomputation
+    ARRAY_NAMES = (
+        'feature', 'threshold', 'left', 'right', 'value', 'tree_offsets',
+        'is_leaf', 'feature_safe',
+    )
+
+    def __init__(self, feature, threshold, left, right, value, tree_offsets, max_depth):
+        """
+        A tree ensemble flattened into contiguous node arrays.
+
+        Node i of tree t lives at global index tree_offsets[t] + i and the
+        root of every tree is its first node. Child indices are global and
+        the two children of a split are always adjacent (right == left + 1),
+        so one traversal step is a single gather plus a comparison. Leaves
+        have feature -1 and point to themselves on both sides.
+
+        Args:
+            feature: Feature index tested at each node, -1 for leaves
+            threshold: Split threshold at each node; rows with X <= threshold go left
+            left: Global index of the left child
+            right: Global index of the right child
+            value: Prediction stored at each node
+            tree_offsets: Global index of each tree's root, plus the total node count
+            max_depth: Deepest root-to-leaf path over all trees
+        """
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.right = np.asarray(right, dtype=np.int32)
+        self.value = np.asarray(value)
+        self.tree_offsets = np.asarray(tree_offsets, dtype=np.int64)
+        self.max_depth = int(max_depth)
+        self.n_trees = len(self.tree_offsets) - 1
+        self.n_features = int(self.feature.max()) + 1 if len(self.feature) else 0
+
+        split = self.feature >= 0
+        if not np.array_equal(self.right[split], self.left[split] + 1):
+            raise ValueError("FlatForest requires the children of every split to be adjacent")
+
+        self.is_leaf = ~split
+        self._threshold32 = self._float32_thresholds(self.threshold)
+        self._feature_safe = np.where(split, self.feature, 0).astype(np.int32)
+
+    @staticmethod
+    def _float32_thresholds(threshold):
+        """
+        Thresholds the traversal compares against.
+
+        Features are compared as float32, as sklearn does. For a float32 x,
+        x <= t holds exactly when x <= the largest float32 not above t, so
+        the comparison can stay in float32 without changing any decision.
+        float32 input is returned as is, so a mapped array stays shared.
+        """
+        if threshold.dtype == np.float32:
+            return threshold
+        threshold32 = threshold.astype(np.float32)
+        too_high = threshold32.astype(np.float64) > threshold
+        threshold32[too_high] = np.nextafter(threshold32[too_high], np.float32(-np.inf))
+        return threshold32
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """
+        Flatten a fitted RandomForestRegressor (or any ensemble of single-output
+        sklearn regression trees exposing ``estimators_``).
+
+        Nodes are renumbered breadth-first so that siblings are adjacent.
+        """
+        features, thresholds, lefts, rights, values = [], [], [], [], []
+        offsets = [0]
+        max_depth = 0
+
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            offset = offsets[-1]
+            children_left = tree.children_left
+            children_right = tree.children_right
+
+            # Breadth-first order: new id -> old id, children placed as pairs
+            order = [0]
+            new_left = [-1]
+            for new_id in range(tree.node_count):
+                old_id = order[new_id]
+                if children_left[old_id] == -1:
+                    new_left[new_id] = new_id
+                else:
+                    new_left[new_id] = len(order)
+                    order.extend((children_left[old_id], children_right[old_id]))
+                    new_left.extend((-1, -1))
+
+            order = np.asarray(order, dtype=np.int64)
+            new_left = np.asarray(new_left, dtype=np.int64)
+            is_leaf = children_left[order] == -1
+
+            features.append(np.where(is_leaf, -1, tree.feature[order]))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold[order]))
+            lefts.append(new_left + offset)
+            rights.append(np.where(is_leaf, new_left, new_left + 1) + offset)
+            values.append(tree.value[order, 0, 0])
+
+            offsets.append(offset + tree.node_count)
+            max_depth = max(max_depth, tree.max_depth)
+
+        forest = cls(
+            np.concatenate(features),
+            np.concatenate(thresholds).astype(np.float64),
+            np.concatenate(lefts),
+            np.concatenate(rights),
+            np.concatenate(values).astype(np.float64),
+            offsets,
+            max_depth,
+        )
+        forest.n_features = model.n_features_in_
+        return forest
+
+    def to_arrays(self):
+        """
+        Return the node arrays keyed by name, as listed in ARRAY_NAMES.
+
+        Thresholds are given once, as the float32 array the traversal
+        compares against. Narrower (float16) thresholds are kept as they are
+        and widened again by from_arrays.
+        """
+        narrow = self.threshold.dtype.itemsize < 4
+        return {
+            'feature': self.feature,
+            'threshold': self.threshold if narrow else self._threshold32,
+            'left': self.left,
+            'right': self.right,
+            'value': self.value,
+            'tree_offsets': self.tree_offsets,
+            'is_leaf': self.is_leaf,
+            'feature_safe': self._feature_safe,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays, max_depth, n_features):
+        """
+        Rebuild a forest from the output of to_arrays without copying, so
+        read-only memory-mapped arrays stay shared. Only float16 thresholds
+        are widened to a private float32 copy. A 'threshold32' entry (format
+        1 artifacts) is used as is.
+        """
+        forest = cls.__new__(cls)
+        forest.feature = arrays['feature']
+        forest.threshold = arrays['threshold']
+        forest.left = arrays['left']
+        forest.right = arrays['right']
+        forest.value = arrays['value']
+        forest.tree_offsets = arrays['tree_offsets']
+        forest.is_leaf = arrays['is_leaf']
+        if 'threshold32' in arrays:
+            forest._threshold32 = arrays['threshold32']
+        else:
+            forest._threshold32 = cls._float32_thresholds(forest.threshold)
+        forest._feature_safe = arrays['feature_safe']
+        forest.max_depth = int(max_depth)
+        forest.n_trees = len(forest.tree_offsets) - 1
+        forest.n_features = int(n_features)
+        return forest
+
+    def apply(self, X):
+        """
+        Find the leaf reached by every row in every tree.
+
+        All (tree, row) pairs advance one level per step and pairs that reach
+        a leaf drop out of the working set, so the Python loop runs at most
+        max_depth times per chunk regardless of forest size.
+
+        Args:
+            X: Feature matrix of shape (n_samples, n_features)
+
+        Returns:
+            Global leaf indices of shape (n_trees, n_samples)
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_samples = X.shape[0]
+        leaves = np.empty((self.n_trees, n_samples), dtype=np.int32)
+        for start in range(0, n_samples, self.CHUNK_SIZE):
+            stop = min(start + self.CHUNK_SIZE, n_samples)
+            leaves[:, start:stop] = self._apply_chunk(X[start:stop])
+        return leaves
+
+    def _apply_chunk(self, X):
+        n_samples, n_features = X.shape
+        X_flat = X.ravel()
+
+        nodes = np.repeat(self.tree_offsets[:-1].astype(np.int32), n_samples)
+        row_base = np.tile(np.arange(0, n_samples * n_features, n_features, dtype=np.int32), self.n_trees)
+        active = np.flatnonzero(~self.is_leaf.take(nodes))
+
+        while len(active):
+            current = nodes.take(active)
+            x = X_flat.take(row_base.take(active) + self._feature_safe.take(current))
+            child = self.left.take(current) + (x > self._threshold32.take(current))
+            nodes[active] = child
+            active = active[~self.is_leaf.take(child)]
+        return nodes.reshape(self.n_trees, n_samples)
+
+    def predict_per_tree(self, X):
+        """Return every tree's prediction, shape (n_trees, n_samples)"""
+        return self.value.take(self.apply(X)).astype(np.float64, copy=False)
+
+    def predict(self, X):
+        """Return the forest prediction (mean over trees), shape (n_samples,)"""
+        return self.predict_per_tree(X).mean(axis=0)
+
+    def predict_grid(self, base, axes):
+        """
+        Forest prediction for every combination of the axes' values applied to
+        one base row, without traversing the trees once per grid point.
+
+        Each tree is walked once from its root. Splits on columns no axis sets
+        follow the base row. Splits on swept columns go both ways, and each
+        child keeps, per axis, the mask of values that still reach it. A
+        reachable leaf then covers the outer product of its masks, so the grid
+        is a weighted sum of those products. The cost grows with the number of
+        reachable leaves and the axis lengths, not with the grid size.
+
+        Args:
+            base: Feature row of shape (n_features,)
+            axes: List of (columns, values) pairs; values has shape
+                (n_values, len(columns)) and row i holds the columns' values for
+                point i of that axis. No column may belong to two axes.
+
+        Returns:
+            Mean prediction over trees, shaped (n_values of each axis)
+        """
+        base32 = np.asarray(base, dtype=np.float32)
+        shape = tuple(len(values) for _, values in axes)
+        # A path's masks for all axes side by side in one row; owner[j] is the
+        # axis of mask column j. table[f, j] is the value of feature f at that
+        # axis point (only read for features the owning axis sets).
+        owner = np.repeat(np.arange(len(shape)), shape)
+        axis_of = np.full(len(base32), -1, dtype=np.intp)
+        table = np.zeros((len(base32), len(owner)), dtype=np.float32)
+        start = 0
+        for k, (columns, values) in enumerate(axes):
+            axis_of[columns] = k
+            table[columns, start:start + shape[k]] = np.asarray(values, dtype=np.float32).reshape(shape[k], len(columns)).T
+            start += shape[k]
+
+        nodes = self.tree_offsets[:-1].astype(np.intp)
+        masks = np.ones((len(nodes), len(owner)), dtype=bool)
+        leaf_nodes, leaf_masks = [], []
+        while len(nodes):
+            at_leaf = self.is_leaf.take(nodes)
+            leaf_nodes.append(nodes[at_leaf])
+            leaf_masks.append(masks[at_leaf])
+            nodes, masks = nodes[~at_leaf], masks[~at_leaf]
+
+            feature = self._feature_safe.take(nodes)
+            threshold = self._threshold32.take(nodes)
+            left = self.left.take(nodes)
+            axis = axis_of.take(feature)
+
+            fixed = axis < 0
+            split = ~fixed
+            # Only the split's own axis narrows; every other mask passes through
+            own = owner == axis[split, np.newaxis]
+            go_right = table.take(feature[split], axis=0) > threshold[split, np.newaxis]
+            split_masks = masks[split]
+            left_masks = split_masks & ~(own & go_right)
+            right_masks = split_masks & ~(own & ~go_right)
+            left_alive = (left_masks & own).any(axis=1)
+            right_alive = (right_masks & own).any(axis=1)
+
+            split_left = left[split]
+            nodes = np.concatenate([
+                left[fixed] + (base32.take(feature[fixed]) > threshold[fixed]),
+                split_left[left_alive],
+                split_left[right_alive] + 1,
+            ])
+            masks = np.concatenate([masks[fixed], left_masks[left_alive], right_masks[right_alive]])
+
+        values = self.value.take(np.concatenate(leaf_nodes)).astype(np.float64)
+        factors = np.split(np.concatenate(leaf_masks), np.cumsum(shape)[:-1], axis=1)
+        # Sum over leaves of value x outer product of its masks: expand the
+        # leading axes per leaf, contract the last one with a matrix product
+        grid = np.zeros((int(np.prod(shape[:-1])), shape[-1]))
+        for start in range(0, len(values), self.GRID_CHUNK_SIZE):
+            stop = start + self.GRID_CHUNK_SIZE
+            weights = values[start:stop, np.newaxis]
+            for factor in factors[:-1]:
+                weights = (weights[:, :, np.newaxis] * factor[start:stop, np.newaxis, :]).reshape(len(weights), -1)
+            grid += weights.T @ factors[-1][start:stop]
+        return grid.reshape(shape) / self.n_trees
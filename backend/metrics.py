@@ -0,0 +1,320 @@
+"""
+In-process request metrics and sampled profiling.
+
+Metrics are plain counters, gauges and fixed-bucket histograms kept in memory
+and rendered in the Prometheus text exposition format by ``/metrics``. An
+observation costs a bisect and an increment under a per-metric lock, so the
+request path can be timed stage by stage without measurable overhead.
+
+Metrics are per process; with several workers, scrape each one or run the
+server threaded in a single process.
+"""
+import cProfile
+import logging
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+
+# Upper bounds in seconds; request stages range from microseconds (cache hit)
+# to tens of milliseconds (joblib model under load)
+DEFAULT_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5
+)
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """Child metric for one combination of label values (created on first use)"""
+        child = self._children.get(values)
+        if child is None:
+            # Slow path: validate and store under string values
+            if len(values) != len(self.label_names):
+                raise ValueError(f"{self.name} expects labels {self.label_names}")
+            values = tuple(str(value) for value in values)
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _default(self):
+        # Unlabelled metrics are used directly
+        return self.labels()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            children = sorted(self._children.items())
+        for values, child in children:
+            lines.extend(self._render_child(values, child))
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, optionally split by labels"""
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+    def _render_child(self, values, child):
+        yield f"{self.name}{_format_labels(self.label_names, values)} {_format_value(child.value)}"
+
+
+class _GaugeChild:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+
+class Gauge(_Metric):
+    """Value that is set rather than accumulated"""
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._default().set(value)
+
+    def clear(self):
+        """Drop every labelled child, e.g. before re-publishing an info metric"""
+        with self._lock:
+            self._children = {}
+
+    def _render_child(self, values, child):
+        yield f"{self.name}{_format_labels(self.label_names, values)} {_format_value(child.value)}"
+
+
+class _HistogramChild:
+    __slots__ = ('bounds', 'counts', 'sum', '_lock')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        # One slot per bucket plus the overflow (+Inf) slot
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self):
+        """Context manager observing the duration of its block"""
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ('child', 'start')
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.child.observe(time.perf_counter() - self.start)
+
+
+class Histogram(_Metric):
+    """Distribution of observations in fixed cumulative buckets"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.bounds = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+    def _render_child(self, values, child):
+        with child._lock:
+            counts = list(child.counts)
+            total = child.sum
+        cumulative = 0
+        for bound, count in zip(self.bounds + (float('inf'),), counts):
+            cumulative += count
+            labels = _format_labels(self.label_names, values, [('le', _format_value(bound))])
+            yield f"{self.name}_bucket{labels} {cumulative}"
+        labels = _format_labels(self.label_names, values)
+        yield f"{self.name}_sum{labels} {_format_value(total)}"
+        yield f"{self.name}_count{labels} {cumulative}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """Named collection of metrics rendered together"""
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, documentation, label_names=()):
+        return self._register(Counter, name, documentation, label_names)
+
+    def gauge(self, name, documentation, label_names=()):
+        return self._register(Gauge, name, documentation, label_names)
+
+    def histogram(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, label_names, buckets)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide registry shared by the app and the prediction service
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'housewise_stage_seconds', 'Time spent in each stage of the request path', ['stage']
+)
+ERRORS = REGISTRY.counter(
+    'housewise_errors_total', 'Failed requests and batch items by kind and exception type', ['kind', 'exception']
+)
+MODEL_LOAD_SECONDS = REGISTRY.gauge(
+    'housewise_model_load_seconds', 'Time to load (and for reloads, warm) the model being served'
+)
+
+
+def stage(name):
+    """Time a block as one request stage: ``with stage('preprocess'): ...``"""
+    return STAGE_SECONDS.labels(name).time()
+
+
+def record_error(kind, error):
+    """
+    Count a failure.
+
+    Args:
+        kind: Where it happened ('validation', 'invalid_input', 'prediction', 'internal')
+        error: The exception, whose class name becomes the exception label, or a name
+    """
+    ERRORS.labels(kind, error if isinstance(error, str) else type(error).__name__).inc()
+
+
+class SampledProfiler:
+    def __init__(self, rate=0.0, dump_dir='profiles'):
+        """
+        Run cProfile on a random share of requests and dump each profile to a
+        .prof file for ``python -m pstats`` or snakeviz.
+
+        At most one request is profiled at a time, so overhead stays bounded
+        and concurrent profilers never clash. rate and dump_dir may be changed
+        at runtime.
+
+        Args:
+            rate: Share of requests to profile, between 0 and 1
+            dump_dir: Directory the .prof files are written to
+        """
+        self.rate = rate
+        self.dump_dir = dump_dir
+        self.dumps = 0
+        self.logger = logging.getLogger(__name__)
+        self._busy = threading.Lock()
+
+    @property
+    def rate(self):
+        return self._rate
+
+    @rate.setter
+    def rate(self, rate):
+        rate = float(rate)
+        if not 0 <= rate <= 1:
+            raise ValueError("Profiling rate must be between 0 and 1")
+        self._rate = rate
+
+    def start(self):
+        """Begin profiling the current request if it is sampled; returns the profiler or None"""
+        if self._rate <= 0 or random.random() >= self._rate:
+            return None
+        if not self._busy.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def stop(self, profiler, name):
+        """Stop a profiler returned by start and dump it as <dump_dir>/<time>-<pid>-<name>.prof"""
+        try:
+            profiler.disable()
+            os.makedirs(self.dump_dir, exist_ok=True)
+            path = os.path.join(self.dump_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self.dumps}-{name}.prof")
+            profiler.dump_stats(path)
+            self.dumps += 1
+        except Exception as e:
+            self.logger.error(f"Failed to write profile: {str(e)}")
+        finally:
+            self._busy.release()
+
+    def stats(self):
+        return {'rate': self._rate, 'dump_dir': os.path.abspath(self.dump_dir), 'dumps': self.dumps}
@@ -0,0 +1,170 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    def __init__(self, predict_fn, max_latency_ms=2.0, max_batch_size=64):
+        """
+        Coalesce concurrent single-row predictions into batched model calls.
+
+        A background worker takes the first waiting row, keeps collecting rows
+        until either max_latency_ms has passed or max_batch_size rows are
+        queued, runs predict_fn once on the stacked matrix and hands each
+        caller its own result.
+
+        Rows submitted with a context are only batched with rows sharing the
+        same context object, and predict_fn is called as predict_fn(X, context).
+        PredictionService passes its model state here so that rows queued
+        before a model swap are still scored by the model they were
+        preprocessed for.
+
+        Args:
+            predict_fn: Callable mapping an (n, n_features) matrix to n predictions
+            max_latency_ms: Longest time a row waits for others to join its batch
+            max_batch_size: Largest number of rows scored in one call
+        """
+        if max_latency_ms < 0:
+            raise ValueError("max_latency_ms must not be negative")
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+
+        self.predict_fn = predict_fn
+        self.max_latency = max_latency_ms / 1000.0
+        self.max_batch_size = int(max_batch_size)
+        self.logger = logging.getLogger(__name__)
+
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._rows = 0
+        self._largest_batch = 0
+        # Observed batch sizes, bucketed by powers of two (1, 2, 4, ...)
+        self._size_buckets = {}
+
+        # Serializes submit and close so that no row is queued behind the
+        # shutdown marker, where the worker would never see it
+        self._lock = threading.Lock()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, row, context=None):
+        """
+        Queue one feature row for prediction.
+
+        Args:
+            row: 1-D feature vector
+            context: Optional object passed on to predict_fn with the batch
+
+        Returns:
+            Future resolving to the prediction for this row
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed")
+            self._queue.put((row, context, future))
+        return future
+
+    def predict(self, row, context=None):
+        """Predict one feature row, blocking until its batch has been scored"""
+        return self.submit(row, context).result()
+
+    def stats(self):
+        """Return counters describing the batches scored so far"""
+        with self._stats_lock:
+            return {
+                'batches': self._batches,
+                'rows': self._rows,
+                'mean_batch_size': round(self._rows / self._batches, 2) if self._batches else 0.0,
+                'largest_batch': self._largest_batch,
+                'batch_size_buckets': {
+                    f"<={bucket}": count for bucket, count in sorted(self._size_buckets.items())
+                },
+                'queued': self._queue.qsize(),
+                'max_latency_ms': self.max_latency * 1000.0,
+                'max_batch_size': self.max_batch_size
+            }
+
+    def close(self):
+        """
+        Stop the worker once the rows queued so far have been scored. Any row
+        still queued after that fails with RuntimeError instead of leaving
+        its caller waiting.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._worker.join()
+
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[2].set_exception(RuntimeError("MicroBatcher is closed"))
+
+    def _collect(self, first):
+        """Gather rows that arrive within the latency window after the first one"""
+        batch = [first]
+        deadline = time.perf_counter() + self.max_latency
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Re-queue the shutdown marker so the run loop sees it
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _record(self, size):
+        bucket = 1
+        while bucket < size:
+            bucket *= 2
+        with self._stats_lock:
+            self._batches += 1
+            self._rows += size
+            self._largest_batch = max(self._largest_batch, size)
+            self._size_buckets[bucket] = self._size_buckets.get(bucket, 0) + 1
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                break
+
+            batch = self._collect(first)
+            self._record(len(batch))
+
+            # Almost always a single group; several only around a model swap
+            groups = {}
+            for row, context, future in batch:
+                groups.setdefault(id(context), (context, []))[1].append((row, future))
+            for context, items in groups.values():
+                self._score(context, items)
+
+    def _score(self, context, items):
+        futures = [future for _, future in items]
+        try:
+            X = np.vstack([row for row, _ in items])
+            predictions = self.predict_fn(X) if context is None else self.predict_fn(X, context)
+        except Exception as e:
+            self.logger.error(f"Batched prediction failed: {str(e)}")
+            for future in futures:
+                future.set_exception(e)
+            return
+
+        for future, prediction in zip(futures, predictions.tolist()):
+            future.set_result(prediction)
@@ -0,0 +1,179 @@
+"""
+Compact, memory-mappable model artifact.
+
+Layout of a single ``.hwf`` file:
+
+    MAGIC (8 bytes) | header length (uint64, little endian) | JSON header | arrays
+
+The JSON header records the format version, the preprocessing plan, forest
+metadata and, for every node array, its dtype, shape and byte offset. Arrays
+are stored raw and 64-byte aligned, so a worker can map them read-only with
+``mmap`` and the OS page cache shares a single copy across processes. Loading
+needs NumPy only; sklearn is imported solely by the joblib converter.
+
+Usage:
+    python model_artifact.py convert model.joblib model.hwf
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from feature_plan import FeaturePlan
+from flat_forest import FlatForest
+
+MAGIC = b'HWFOREST'
+# Version 2 stores thresholds once, in the precision they are compared in;
+# version 1 files (float64 thresholds plus a float32 copy) are still read
+FORMAT_VERSION = 2
+READABLE_VERSIONS = (1, 2)
+ALIGNMENT = 64
+
+_LENGTH = struct.Struct('<Q')
+
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def save_flat_artifact(path, forest, plan, metadata=None):
+    """
+    Write a FlatForest and its FeaturePlan to a single artifact file.
+
+    Args:
+        path: Destination file path
+        forest: FlatForest to store
+        plan: FeaturePlan used to build the forest's input rows
+        metadata: Optional JSON-serializable dict stored in the header
+    """
+    arrays = forest.to_arrays()
+    specs = {}
+    offset = 0
+    for name in FlatForest.ARRAY_NAMES:
+        array = np.ascontiguousarray(arrays[name])
+        specs[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset = _aligned(offset + array.nbytes)
+
+    header = json.dumps({
+        'format_version': FORMAT_VERSION,
+        'preprocessing': plan.to_dict(),
+        'forest': {
+            'n_trees': forest.n_trees,
+            'n_features': forest.n_features,
+            'max_depth': forest.max_depth,
+        },
+        'arrays': specs,
+        'metadata': metadata or {},
+    }).encode('utf-8')
+    data_start = _aligned(len(MAGIC) + _LENGTH.size + len(header))
+
+    # Write to a temporary file first so readers never see a partial artifact
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(_LENGTH.pack(len(header)))
+        f.write(header)
+        for name in FlatForest.ARRAY_NAMES:
+            f.seek(data_start + specs[name]['offset'])
+            f.write(np.ascontiguousarray(arrays[name]).tobytes())
+    os.replace(tmp_path, path)
+
+
+def read_header(path):
+    """Read and check an artifact's header without touching the node arrays"""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a HouseWise model artifact")
+        (length,) = _LENGTH.unpack(f.read(_LENGTH.size))
+        header = json.loads(f.read(length))
+
+    if header['format_version'] not in READABLE_VERSIONS:
+        raise ValueError(
+            f"Unsupported artifact format version {header['format_version']} "
+            f"(expected {FORMAT_VERSION})"
+        )
+    header['data_start'] = _aligned(len(MAGIC) + _LENGTH.size + length)
+    return header
+
+
+def load_flat_artifact(path, use_mmap=True):
+    """
+    Open an artifact written by save_flat_artifact.
+
+    Args:
+        path: Artifact file path
+        use_mmap: Map the node arrays read-only instead of reading them into
+            private memory
+
+    Returns:
+        tuple: (forest, plan, header)
+    """
+    header = read_header(path)
+    data_start = header['data_start']
+
+    with open(path, 'rb') as f:
+        if use_mmap:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            buffer = f.read()
+
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'], dtype=np.int64))
+        arrays[name] = np.frombuffer(
+            buffer, dtype=dtype, count=count, offset=data_start + spec['offset']
+        ).reshape(spec['shape'])
+
+    forest = FlatForest.from_arrays(arrays, header['forest']['max_depth'], header['forest']['n_features'])
+    plan = FeaturePlan.from_dict(header['preprocessing'])
+    return forest, plan, header
+
+
+def artifact_version(path):
+    """Short content hash identifying a model file (flat artifact or joblib)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def convert_joblib(joblib_path, artifact_path):
+    """
+    Convert a model.joblib saved by train_model into a flat artifact.
+
+    Args:
+        joblib_path: Path to the joblib dict (model, encoder, scaler, cat_cols, num_cols)
+        artifact_path: Destination artifact path
+    """
+    import joblib
+
+    components = joblib.load(joblib_path)
+    forest = FlatForest.from_sklearn(components['model'])
+    plan = FeaturePlan.from_fitted(
+        components['encoder'], components['scaler'], components['cat_cols'], components['num_cols']
+    )
+    save_flat_artifact(artifact_path, forest, plan)
+    return forest, plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    convert = subparsers.add_parser('convert', help='Convert a joblib model into a flat artifact')
+    convert.add_argument('joblib_path')
+    convert.add_argument('artifact_path')
+    args = parser.parse_args()
+
+    forest, _ = convert_joblib(args.joblib_path, args.artifact_path)
+    size = os.path.getsize(args.artifact_path)
+    print(f"Wrote {args.artifact_path}: {forest.n_trees} trees, {len(forest.value):,} nodes, {size / 1e6:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
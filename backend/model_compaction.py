@@ -0,0 +1,316 @@
+"""
+Smaller variants of a trained forest, with an accuracy/latency report.
+
+A variant is built from the full forest by any combination of:
+
+    t<k>     keep the first k trees (the trees of a random forest are
+             exchangeable, so this is an unbiased subsample)
+    d<n>     cut every tree at depth n; nodes at the cap become leaves that
+             predict their node value (the mean of their training samples)
+    m<tol>   merge sibling leaves whose values differ by at most tol relative
+             to their parent's value, bottom-up until nothing changes
+    f32      store leaf values as float32 (artifacts always hold float32
+             thresholds, the precision the engine compares in)
+    f16      store thresholds as float16 and leaf values as float32
+
+Steps are joined with '-', e.g. ``t50-d12-f32``; ``full`` is the unchanged
+forest. f32 is lossless for decisions, because features are compared as
+float32 anyway. f16 thresholds are widened to float32 when loaded, so they
+shrink the file but not the memory of a worker. Leaf values never go below
+float32: house prices overflow float16 (largest value 65504).
+
+Every variant is saved as a flat artifact that PredictionService.from_file
+serves like any other, and is scored in a fresh interpreter on the rows
+train_model held out. Accuracy figures are therefore only meaningful for
+models trained by train_model; a model from run_training has seen those rows.
+
+Usage:
+    python model_compaction.py model.joblib --out-dir variants
+    python model_compaction.py model.hwf --variants full t25 d10-f32 --output report.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from flat_forest import FlatForest
+from model_artifact import load_flat_artifact, save_flat_artifact
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_VARIANTS = [
+    'full', 'f32', 'f16', 't50', 't25', 'd16', 'd12', 'd10', 'd8',
+    'm0.01', 'm0.05', 't50-d12-f32', 't50-d12-m0.01-f32',
+]
+
+
+def node_depths(forest):
+    """Depth of every node below its tree's root"""
+    depths = np.zeros(len(forest.feature), dtype=np.int32)
+    level = np.asarray(forest.tree_offsets[:-1])
+    depth = 0
+    while len(level):
+        depths[level] = depth
+        splits = level[~forest.is_leaf[level]]
+        level = np.concatenate([forest.left[splits], forest.left[splits] + 1])
+        depth += 1
+    return depths
+
+
+def _rebuild(forest, feature, threshold, left, value, tree_offsets):
+    compact = FlatForest(
+        feature, threshold, left, np.where(feature >= 0, left + 1, left), value, tree_offsets, 0
+    )
+    compact.max_depth = int(node_depths(compact).max()) if len(feature) else 0
+    # Pruning can drop every split on the highest feature; the input width stays the same
+    compact.n_features = forest.n_features
+    return compact
+
+
+def prune(forest, to_leaf):
+    """
+    Turn the nodes in a boolean mask into leaves and drop their subtrees.
+
+    Surviving nodes keep their relative order, which stays breadth-first
+    with siblings adjacent, so only the indices need remapping.
+    """
+    to_leaf = to_leaf & ~forest.is_leaf
+    removed = np.zeros(len(forest.feature), dtype=bool)
+    parents = np.flatnonzero(to_leaf)
+    while len(parents):
+        children = np.concatenate([forest.left[parents], forest.left[parents] + 1])
+        removed[children] = True
+        parents = children[~forest.is_leaf[children]]
+
+    keep = ~removed
+    new_index = np.cumsum(keep) - 1
+    leaf = (forest.is_leaf | to_leaf)[keep]
+    kept = np.flatnonzero(keep)
+    return _rebuild(
+        forest,
+        np.where(leaf, -1, forest.feature[keep]),
+        np.where(leaf, 0, forest.threshold[keep]).astype(forest.threshold.dtype),
+        np.where(leaf, np.arange(len(kept)), new_index[forest.left[keep]]),
+        forest.value[keep],
+        new_index[forest.tree_offsets[:-1]].tolist() + [len(kept)],
+    )
+
+
+def keep_trees(forest, n_trees):
+    """The first n_trees trees of the forest"""
+    if not 0 < n_trees <= forest.n_trees:
+        raise ValueError(f"Cannot keep {n_trees} of {forest.n_trees} trees")
+    end = forest.tree_offsets[n_trees]
+    return _rebuild(
+        forest, forest.feature[:end], forest.threshold[:end], forest.left[:end],
+        forest.value[:end], forest.tree_offsets[:n_trees + 1]
+    )
+
+
+def limit_depth(forest, max_depth):
+    """Cut every tree at max_depth; the cut nodes predict their own value"""
+    if max_depth < 1:
+        raise ValueError("max_depth must be at least 1")
+    return prune(forest, node_depths(forest) >= max_depth)
+
+
+def merge_leaves(forest, tolerance):
+    """
+    Collapse splits whose two children are leaves with values within
+    tolerance (relative to the split's own value), until none are left.
+    """
+    while True:
+        splits = np.flatnonzero(~forest.is_leaf)
+        left = forest.left[splits]
+        both_leaves = forest.is_leaf[left] & forest.is_leaf[left + 1]
+        values = forest.value.astype(np.float64)
+        close = np.abs(values[left] - values[left + 1]) <= tolerance * np.abs(values[splits])
+        mergeable = splits[both_leaves & close]
+        if not len(mergeable):
+            return forest
+        to_leaf = np.zeros(len(forest.feature), dtype=bool)
+        to_leaf[mergeable] = True
+        forest = prune(forest, to_leaf)
+
+
+def quantize(forest, precision):
+    """
+    Store thresholds (and leaf values) at reduced precision.
+
+    Args:
+        forest: FlatForest to convert
+        precision: 'float32' or 'float16'; values stay at least float32
+    """
+    if precision == 'float32':
+        # FlatForest compares against this already, so no decision changes
+        threshold = forest._threshold32.copy()
+    elif precision == 'float16':
+        threshold = forest.threshold.astype(np.float16)
+    else:
+        raise ValueError(f"Unsupported precision: {precision}")
+    return _rebuild(
+        forest, forest.feature, threshold, forest.left, forest.value.astype(np.float32), forest.tree_offsets
+    )
+
+
+def parse_spec(spec):
+    """Split a variant spec into {step: argument}, rejecting malformed steps"""
+    steps = {}
+    for token in spec.split('-'):
+        if token == 'full':
+            continue
+        kind, argument = token[:1], token[1:]
+        if kind in steps or kind not in ('t', 'd', 'm', 'f'):
+            raise ValueError(f"Invalid variant step {token!r} in {spec!r}")
+        try:
+            steps[kind] = float(argument) if kind == 'm' else int(argument)
+        except ValueError:
+            raise ValueError(f"Invalid variant step {token!r} in {spec!r}") from None
+    if steps.get('f', 32) not in (32, 16):
+        raise ValueError(f"Invalid variant {spec!r}: precision must be f32 or f16")
+    return steps
+
+
+def compact(forest, spec):
+    """
+    Build the variant described by spec (see the module docstring).
+
+    Steps run in a fixed order (trees, depth, merge, precision) whatever
+    order they are written in.
+    """
+    steps = parse_spec(spec)
+    if 't' in steps:
+        forest = keep_trees(forest, steps['t'])
+    if 'd' in steps:
+        forest = limit_depth(forest, steps['d'])
+    if 'm' in steps:
+        forest = merge_leaves(forest, steps['m'])
+    if 'f' in steps:
+        forest = quantize(forest, f"float{steps['f']}")
+    return forest
+
+
+def load_forest(path):
+    """FlatForest and FeaturePlan from a flat artifact or a joblib model"""
+    if path.endswith('.hwf'):
+        forest, plan, _ = load_flat_artifact(path, use_mmap=False)
+        return forest, plan
+    import joblib
+    from feature_plan import FeaturePlan
+
+    components = joblib.load(path)
+    plan = FeaturePlan.from_fitted(
+        components['encoder'], components['scaler'], components['cat_cols'], components['num_cols']
+    )
+    return FlatForest.from_sklearn(components['model']), plan
+
+
+def probe(path, n_requests):
+    """
+    Runs in a fresh interpreter: serve one variant through PredictionService
+    and print its holdout accuracy, latency and memory as JSON.
+    """
+    from benchmark import memory_usage, percentiles, request_bodies
+    from model_trainer import _regression_metrics, holdout_split
+    from prediction_service import PredictionService
+
+    _, X_test, _, y_test = holdout_split()
+    bodies = request_bodies(X_test)
+    before = memory_usage()
+
+    service = PredictionService.from_file(path)
+    predicted = service._score_matrix(service.plan.transform_frame(X_test))[:, 0]
+    metrics = _regression_metrics(y_test.to_numpy(), predicted)
+
+    latencies = []
+    for i in range(n_requests):
+        start = time.perf_counter()
+        service.predict_payload(bodies[i % len(bodies)])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    after = memory_usage()
+    model_rss = after['rss_mb'] - before['rss_mb'] if 'rss_mb' in after else None
+    print(json.dumps({**metrics, **percentiles(latencies), 'model_rss_mb': model_rss}))
+
+
+def evaluate(path, n_requests):
+    result = subprocess.run(
+        [sys.executable, os.path.join(BACKEND_DIR, 'model_compaction.py'), '_probe', path, str(n_requests)],
+        env=dict(os.environ, PYTHONPATH=BACKEND_DIR), capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def build_report(model_path, variants, out_dir, n_requests):
+    """
+    Write every variant to <out_dir>/<spec>.hwf and evaluate it.
+
+    Returns:
+        list: One dict per variant, in the order given
+    """
+    forest, plan = load_forest(model_path)
+    os.makedirs(out_dir, exist_ok=True)
+    report = []
+    for spec in variants:
+        variant = compact(forest, spec)
+        path = os.path.join(out_dir, f"{spec}.hwf")
+        save_flat_artifact(path, variant, plan, metadata={'compaction': spec, 'source': os.path.abspath(model_path)})
+        row = {
+            'variant': spec,
+            'path': path,
+            'trees': variant.n_trees,
+            'nodes': len(variant.feature),
+            'max_depth': variant.max_depth,
+            'size_mb': os.path.getsize(path) / 1e6,
+        }
+        row.update(evaluate(path, n_requests))
+        report.append(row)
+    return report
+
+
+def print_report(report):
+    baseline = report[0]
+    print(f"{'variant':<20} {'trees':>5} {'nodes':>9} {'depth':>5} {'size MB':>8} {'RSS MB':>7} "
+          f"{'p50 ms':>7} {'p99 ms':>7} {'MAE':>9} {'MAPE %':>7} {'ΔMAE %':>7}")
+    for row in report:
+        rss = f"{row['model_rss_mb']:.1f}" if row['model_rss_mb'] is not None else '-'
+        delta = (row['mae'] / baseline['mae'] - 1) * 100
+        print(f"{row['variant']:<20} {row['trees']:>5} {row['nodes']:>9,} {row['max_depth']:>5} "
+              f"{row['size_mb']:>8.2f} {rss:>7} {row['p50_ms']:>7.2f} {row['p99_ms']:>7.2f} "
+              f"{row['mae']:>9,.0f} {row['mape']:>7.2f} {delta:>+7.1f}")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '_probe':
+        probe(sys.argv[2], int(sys.argv[3]))
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('model_path', help='.joblib model or .hwf flat artifact to compact')
+    parser.add_argument('--variants', nargs='+', default=DEFAULT_VARIANTS,
+                        help='Variant specs; the first is the baseline for ΔMAE')
+    parser.add_argument('--out-dir', default='variants', help='Directory the variant artifacts are written to')
+    parser.add_argument('--requests', type=int, default=1000, help='Timed /predict payloads per variant')
+    parser.add_argument('--output', help='Also write the report as JSON')
+    args = parser.parse_args()
+
+    # Fail on a typo before spending minutes on the other variants
+    for spec in args.variants:
+        try:
+            parse_spec(spec)
+        except ValueError as e:
+            parser.error(str(e))
+    report = build_report(args.model_path, args.variants, args.out_dir, args.requests)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+"""
+Versioned model registry and zero-downtime reloads.
+
+A registry is a directory of immutable model files plus a manifest naming the
+active version:
+
+    models/
+        manifest.json
+        v0001.joblib
+        v0002.hwf
+
+Publishing copies a model file in under the next version number and, unless
+told otherwise, activates it. The manifest is replaced atomically, so a
+reader sees either the old or the new active version, never a partial write.
+A running app picks up a new active version through ModelReloader, either on
+an admin request or by polling the manifest.
+
+Usage:
+    python model_registry.py publish model.hwf --registry models
+    python model_registry.py activate v0001 --registry models
+    python model_registry.py list --registry models
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+from model_artifact import artifact_version
+
+MANIFEST_NAME = 'manifest.json'
+MODEL_EXTENSIONS = ('.hwf', '.joblib')
+
+
+class ModelRegistry:
+    def __init__(self, root):
+        """
+        Args:
+            root: Registry directory (created on first publish)
+        """
+        self.root = os.path.abspath(root)
+        self.manifest_path = os.path.join(self.root, MANIFEST_NAME)
+
+    def read_manifest(self):
+        """Return the manifest dict (empty registry if none was written yet)"""
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'active': None, 'versions': []}
+
+    def _write_manifest(self, manifest):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def versions(self):
+        """Published versions, oldest first"""
+        return self.read_manifest()['versions']
+
+    def active_version(self):
+        """Version new workers and reloads should serve, or None"""
+        return self.read_manifest()['active']
+
+    def resolve(self, version=None):
+        """
+        Locate a model file.
+
+        Args:
+            version: Published version; the active one if omitted
+
+        Returns:
+            tuple: (version, absolute path of the model file)
+        """
+        manifest = self.read_manifest()
+        version = version or manifest['active']
+        if version is None:
+            raise ValueError(f"Model registry {self.root} has no active version")
+        for entry in manifest['versions']:
+            if entry['version'] == version:
+                return version, os.path.join(self.root, entry['file'])
+        raise ValueError(f"Unknown model version: {version}")
+
+    def publish(self, path, activate=True, metadata=None):
+        """
+        Copy a model file into the registry as a new version.
+
+        Args:
+            path: .hwf flat artifact or .joblib model
+            activate: Make the new version the active one
+            metadata: Optional JSON-serializable dict stored with the version
+
+        Returns:
+            The new version string
+        """
+        extension = os.path.splitext(path)[1]
+        if extension not in MODEL_EXTENSIONS:
+            raise ValueError(f"Unsupported model file {path}: expected .hwf or .joblib")
+
+        manifest = self.read_manifest()
+        version = f"v{len(manifest['versions']) + 1:04d}"
+        file_name = f"{version}{extension}"
+        os.makedirs(self.root, exist_ok=True)
+
+        # Copy under a temporary name so a crash never leaves a truncated model
+        tmp_path = os.path.join(self.root, f"{file_name}.tmp")
+        shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, os.path.join(self.root, file_name))
+
+        manifest['versions'].append({
+            'version': version,
+            'file': file_name,
+            'sha256': artifact_version(os.path.join(self.root, file_name)),
+            'source': os.path.abspath(path),
+            'published_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'metadata': metadata or {}
+        })
+        if activate:
+            manifest['active'] = version
+        self._write_manifest(manifest)
+        return version
+
+    def activate(self, version):
+        """Make a published version the active one (also used to roll back)"""
+        manifest = self.read_manifest()
+        if not any(entry['version'] == version for entry in manifest['versions']):
+            raise ValueError(f"Unknown model version: {version}")
+        manifest['active'] = version
+        self._write_manifest(manifest)
+
+
+class ModelReloader:
+    def __init__(self, service, registry, drain_timeout=30.0):
+        """
+        Swap registry versions into a running PredictionService.
+
+        At most one reload runs at a time. The new model is loaded and warmed
+        while the current one keeps serving, then swapped in with
+        PredictionService.swap_model.
+
+        Args:
+            service: PredictionService to reload
+            registry: ModelRegistry to load versions from
+            drain_timeout: Seconds to wait for requests on the old model
+        """
+        self.service = service
+        self.registry = registry
+        self.drain_timeout = drain_timeout
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._watcher = None
+        self._stop = threading.Event()
+        self._status = {
+            'state': 'idle',
+            'target': None,
+            'last_error': None,
+            'last_reload_seconds': None,
+            'reloads': 0
+        }
+
+    def status(self):
+        """Current model version plus the state of the last reload"""
+        with self._lock:
+            return dict(self._status, model_version=self.service.model_version)
+
+    def reload(self, version=None, wait=False):
+        """
+        Start reloading a version (the registry's active one by default).
+
+        Args:
+            version: Published version to serve
+            wait: Block until the reload finished
+
+        Returns:
+            False if another reload is already running, else True
+        """
+        with self._lock:
+            if self._status['state'] == 'loading':
+                return False
+            self._status.update(state='loading', target=version, last_error=None)
+            self._thread = threading.Thread(target=self._reload, args=(version,), name='model-reload', daemon=True)
+            self._thread.start()
+        if wait:
+            self._thread.join()
+        return True
+
+    def _reload(self, version):
+        start = time.perf_counter()
+        try:
+            version, path = self.registry.resolve(version)
+            if version == self.service.model_version:
+                self.logger.info(f"Model {version} is already being served")
+            else:
+                self.service.reload(path, version, self.drain_timeout)
+                self.logger.info(f"Now serving model {version}")
+            with self._lock:
+                self._status.update(
+                    state='idle', target=version,
+                    last_reload_seconds=round(time.perf_counter() - start, 3),
+                    reloads=self._status['reloads'] + 1
+                )
+        except Exception as e:
+            self.logger.error(f"Model reload failed: {str(e)}")
+            with self._lock:
+                self._status.update(state='failed', last_error=str(e))
+
+    def watch(self, interval=5.0):
+        """
+        Poll the registry manifest every interval seconds and reload when the
+        active version differs from the one being served.
+        """
+        if self._watcher is not None:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name='model-watch', daemon=True)
+        self._watcher.start()
+
+    def _watch(self, interval):
+        last_mtime = None
+        while not self._stop.wait(interval):
+            try:
+                mtime = os.stat(self.registry.manifest_path).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            if mtime == last_mtime:
+                continue
+            try:
+                active = self.registry.active_version()
+            except ValueError as e:
+                # Not valid JSON; a writer that bypassed publish, try again next tick
+                self.logger.warning(f"Could not read model manifest: {str(e)}")
+                continue
+            if active is not None and active != self.service.model_version:
+                # A reload already running refuses this one; look again next tick
+                if not self.reload(active):
+                    continue
+            last_mtime = mtime
+
+    def stop(self):
+        """Stop watching the manifest"""
+        if self._watcher is not None:
+            self._stop.set()
+            self._watcher.join()
+            self._watcher = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--registry', default=os.environ.get('HOUSEWISE_MODEL_REGISTRY', 'models'),
+                        help='Registry directory')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    publish = subparsers.add_parser('publish', help='Add a model file as a new version')
+    publish.add_argument('path', help='.hwf flat artifact or .joblib model')
+    publish.add_argument('--no-activate', action='store_true', help='Publish without making it active')
+    activate = subparsers.add_parser('activate', help='Make a published version active')
+    activate.add_argument('version')
+    subparsers.add_parser('list', help='List published versions')
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.registry)
+    if args.command == 'publish':
+        version = registry.publish(args.path, activate=not args.no_activate)
+        print(f"Published {args.path} as {version}" + ("" if args.no_activate else " (active)"))
+    elif args.command == 'activate':
+        registry.activate(args.version)
+        print(f"Activated {args.version}")
+    else:
+        active = registry.active_version()
+        for entry in registry.versions():
+            marker = '*' if entry['version'] == active else ' '
+            print(f"{marker} {entry['version']}  {entry['file']:<14} {entry['sha256']}  {entry['published_at']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -6,7 +6,17 @@ from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 import joblib
 import os
-from data_generator import generate_synthetic_data
+import argparse
+import itertools
+import json
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from data_generator import generate_synthetic_data, iter_dataset_chunks, iter_synthetic_chunks
+from feature_plan import FeaturePlan
+from flat_forest import FlatForest
+from model_artifact import save_flat_artifact
 
 # Model file path
 MODEL_PATH = 'model.joblib'
@@ -61,6 +71,19 @@ def train_model():
     print(f"Model trained and saved to {MODEL_PATH}")
     return model, encoder, scaler, cat_cols, num_cols
 
+def holdout_split(n_samples=2000):
+    """
+    Raw rows of the train/holdout split made by train_model.
+    
+    train_test_split shuffles by position only, so splitting the raw frame
+    with the same size and seed selects exactly the rows train_model held out.
+    
+    Returns:
+        tuple: (X_train, X_test, y_train, y_test) as DataFrames and Series
+    """
+    data = generate_synthetic_data(n_samples)
+    return train_test_split(data.drop('price', axis=1), data['price'], test_size=0.2, random_state=42)
+
 def load_or_train_model():
     """
     Load an existing model if available, otherwise train a new one.
@@ -80,3 +103,343 @@ def load_or_train_model():
         model, encoder, scaler, cat_cols, num_cols = train_model()
     
     return model, encoder, scaler, cat_cols, num_cols
+
+
+def _dataset_chunks(n_samples, source, chunk_size):
+    """Stream training chunks from an on-disk dataset or the synthetic generator"""
+    if source is not None:
+        return iter_dataset_chunks(source)
+    return iter_synthetic_chunks(n_samples, chunk_size)
+
+
+def _fit_preprocessing(chunks, cat_cols, num_cols):
+    """
+    First pass over the data: fit the scaler incrementally and collect the
+    categories, so the full dataset never has to be in memory as a DataFrame.
+
+    Returns:
+        tuple: (encoder, scaler, n_rows)
+    """
+    scaler = StandardScaler()
+    categories = [set() for _ in cat_cols]
+    sample = None
+    n_rows = 0
+
+    for chunk in chunks:
+        scaler.partial_fit(chunk[num_cols])
+        for seen, col in zip(categories, cat_cols):
+            seen.update(chunk[col].unique())
+        if sample is None:
+            sample = chunk[cat_cols].head(1)
+        n_rows += len(chunk)
+
+    if n_rows == 0:
+        raise ValueError("Training data is empty")
+
+    # Same sorted category order a regular OneHotEncoder fit would produce
+    encoder = OneHotEncoder(categories=[sorted(seen) for seen in categories], sparse=False, handle_unknown='ignore')
+    encoder.fit(sample)
+    return encoder, scaler, n_rows
+
+
+def _fold_bounds(n_train, n_folds):
+    """Start of every cross-validation fold in the training split, plus its end"""
+    return np.linspace(0, n_train, n_folds + 1).astype(int)
+
+
+def _region_positions(shuffled, bounds):
+    """
+    Destination of every input row, given a random permutation and the
+    regions (CV folds and holdout) it is cut into.
+
+    Each region [bounds[k], bounds[k + 1]) gets exactly the rows the
+    permutation sends there, but in input order. The split stays random,
+    while the rows of one chunk bound for one region fill one contiguous slice.
+    """
+    region = np.searchsorted(bounds, shuffled, side='right') - 1
+    positions = np.empty_like(shuffled)
+    positions[np.argsort(region, kind='stable')] = np.arange(len(shuffled))
+    return positions
+
+
+def _build_design_matrix(chunks, plan, n_rows, positions):
+    """
+    Second pass: transform every chunk straight into a preallocated float32
+    design matrix at its destination rows, so train and test rows end up as
+    contiguous blocks and splitting needs no copies.
+
+    Sorted by destination, a chunk splits into runs of consecutive rows (one
+    per region with _region_positions), and each run is transformed in place
+    into its slice of the matrix.
+    """
+    X = np.empty((n_rows, plan.n_features), dtype=np.float32)
+    y = np.empty(n_rows, dtype=np.float64)
+    start = 0
+    for chunk in chunks:
+        stop = start + len(chunk)
+        targets = positions[start:stop]
+        start = stop
+        if not len(targets):
+            continue
+        order = np.argsort(targets, kind='stable')
+        targets = targets[order]
+        chunk = chunk.take(order)
+        price = chunk['price'].to_numpy(dtype=np.float64)
+        breaks = np.flatnonzero(np.diff(targets) != 1) + 1
+        for a, b in zip(np.r_[0, breaks], np.r_[breaks, len(targets)]):
+            lo = targets[a]
+            plan.transform_frame(chunk.iloc[a:b], out=X[lo:lo + b - a])
+            y[lo:lo + b - a] = price[a:b]
+    return X, y
+
+
+def _regression_metrics(y_true, y_pred):
+    errors = y_pred - y_true
+    return {
+        'mae': float(np.mean(np.abs(errors))),
+        'rmse': float(np.sqrt(np.mean(errors ** 2))),
+        'mape': float(np.mean(np.abs(errors) / np.abs(y_true)) * 100),
+        'r2': float(1 - np.sum(errors ** 2) / np.sum((y_true - y_true.mean()) ** 2))
+    }
+
+
+def _peak_memory_mb(worker=False):
+    """
+    Peak resident set size of this process in MB, or None if unknown.
+
+    Reads VmHWM from /proc where it exists. Elsewhere ru_maxrss is used,
+    except in pool workers: it survives fork and exec, so a worker would
+    report its parent's peak. resource only exists on Unix.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if worker:
+        return None
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def _format_mb(value):
+    return 'n/a' if value is None else f"{value:.0f} MB"
+
+
+def _evaluate_config(params, fold_paths, random_state):
+    """
+    Train one configuration on one cached fold (run in a worker process).
+
+    Fold arrays are memory-mapped from the cache written by the parent, so no
+    fold is preprocessed or copied more than once.
+    """
+    X_train, y_train, X_val, y_val = (np.load(path, mmap_mode='r') for path in fold_paths)
+    start = time.perf_counter()
+    model = RandomForestRegressor(random_state=random_state, n_jobs=1, **params)
+    model.fit(X_train, y_train)
+    metrics = _regression_metrics(np.asarray(y_val), model.predict(X_val))
+    metrics['fit_seconds'] = time.perf_counter() - start
+    metrics['peak_memory_mb'] = _peak_memory_mb(worker=True)
+    return metrics
+
+
+def _cache_folds(X_train, y_train, n_folds, cache_dir):
+    """
+    Write each fold's train/validation arrays to .npy files once, streaming
+    the slices straight into the files, and return their paths.
+    """
+    bounds = _fold_bounds(len(X_train), n_folds)
+    folds = []
+    for k in range(n_folds):
+        lo, hi = bounds[k], bounds[k + 1]
+        parts = {
+            'X_train': (X_train[:lo], X_train[hi:]),
+            'y_train': (y_train[:lo], y_train[hi:]),
+            'X_val': (X_train[lo:hi],),
+            'y_val': (y_train[lo:hi],)
+        }
+        paths = []
+        for name, slices in parts.items():
+            path = os.path.join(cache_dir, f"fold{k}_{name}.npy")
+            shape = (sum(len(part) for part in slices),) + slices[0].shape[1:]
+            array = np.lib.format.open_memmap(path, mode='w+', dtype=slices[0].dtype, shape=shape)
+            offset = 0
+            for part in slices:
+                array[offset:offset + len(part)] = part
+                offset += len(part)
+            array.flush()
+            del array
+            paths.append(path)
+        folds.append(tuple(paths))
+    return folds
+
+
+def _search(X_train, y_train, param_grid, n_folds, n_jobs, random_state):
+    """Cross-validate every configuration of param_grid across a process pool"""
+    configs = [dict(zip(param_grid, values)) for values in itertools.product(*param_grid.values())]
+    results = []
+    with tempfile.TemporaryDirectory(prefix='housewise-folds-') as cache_dir:
+        folds = _cache_folds(X_train, y_train, n_folds, cache_dir)
+        # One task per process so each worker's peak memory belongs to one fit
+        with ProcessPoolExecutor(max_workers=n_jobs, max_tasks_per_child=1) as executor:
+            futures = {
+                (i, k): executor.submit(_evaluate_config, params, fold, random_state)
+                for i, params in enumerate(configs)
+                for k, fold in enumerate(folds)
+            }
+            for i, params in enumerate(configs):
+                fold_metrics = [futures[(i, k)].result() for k in range(n_folds)]
+                summary = {
+                    name: float(np.mean([m[name] for m in fold_metrics]))
+                    for name in ('mae', 'rmse', 'mape', 'r2')
+                }
+                summary['fit_seconds'] = float(sum(m['fit_seconds'] for m in fold_metrics))
+                peaks = [m['peak_memory_mb'] for m in fold_metrics]
+                summary['peak_memory_mb'] = None if None in peaks else float(max(peaks))
+                results.append({'params': params, 'cv': summary})
+                print(f"  {params}: cv MAE {summary['mae']:,.0f}  MAPE {summary['mape']:.2f}%  "
+                      f"R2 {summary['r2']:.4f}  fit {summary['fit_seconds']:.1f}s  "
+                      f"peak {_format_mb(summary['peak_memory_mb'])}")
+    return results
+
+
+def run_training(n_samples=2000, source=None, param_grid=None, n_folds=3, n_jobs=-1,
+                 test_size=0.2, chunk_size=500_000, random_state=42, output_path=MODEL_PATH,
+                 artifact_path=None):
+    """
+    Train a house price model on a synthetic dataset of any size or an
+    on-disk dataset written by data_generator.write_synthetic_dataset.
+
+    Data is streamed twice in chunks: once to fit the encoder and scaler and
+    once to fill a float32 design matrix in shuffled order, so the train and
+    holdout splits are views rather than copies. With a param_grid, every
+    configuration is cross-validated on the training split across a process
+    pool; the best one (lowest CV MAE) is refit with all cores.
+
+    Args:
+        n_samples: Number of synthetic rows (ignored when source is given)
+        source: Directory of a chunked dataset to train on instead
+        param_grid: Optional dict of RandomForestRegressor parameter lists,
+            e.g. {'n_estimators': [50, 100], 'max_depth': [None, 16]}
+        n_folds: Cross-validation folds for the search
+        n_jobs: Cores for the final fit and worker processes for the search (-1 = all)
+        test_size: Share of rows held out for the final evaluation
+        chunk_size: Rows per chunk when streaming
+        random_state: Seed for shuffling and the forests
+        output_path: Where to save the winning model in the usual joblib layout
+        artifact_path: Optional path for an additional flat artifact
+
+    Returns:
+        dict: Report with data, search and final model metrics
+    """
+    n_jobs = os.cpu_count() if n_jobs in (None, -1) else n_jobs
+    cat_cols = ['neighborhood', 'condition']
+    num_cols = ['bedrooms', 'bathrooms', 'square_feet', 'lot_size', 'year_built', 'has_garage', 'has_pool']
+    report = {}
+
+    start = time.perf_counter()
+    encoder, scaler, n_rows = _fit_preprocessing(_dataset_chunks(n_samples, source, chunk_size), cat_cols, num_cols)
+    plan = FeaturePlan.from_fitted(encoder, scaler, cat_cols, num_cols)
+
+    # positions[i] is where input row i lands; the first n_train slots are the
+    # training split, cut into the CV folds, and the rest is the holdout
+    n_train = n_rows - int(round(n_rows * test_size))
+    bounds = np.append(_fold_bounds(n_train, n_folds), n_rows)
+    positions = _region_positions(np.random.default_rng(random_state).permutation(n_rows), bounds)
+    X, y = _build_design_matrix(_dataset_chunks(n_samples, source, chunk_size), plan, n_rows, positions)
+    X_train, y_train, X_test, y_test = X[:n_train], y[:n_train], X[n_train:], y[n_train:]
+    report['data'] = {
+        'rows': n_rows,
+        'train_rows': n_train,
+        'features': plan.n_features,
+        'design_matrix_mb': X.nbytes / 1e6,
+        'prepare_seconds': time.perf_counter() - start
+    }
+    print(f"Prepared {n_rows:,} rows x {plan.n_features} features ({X.nbytes / 1e6:.0f} MB float32) "
+          f"in {report['data']['prepare_seconds']:.1f}s")
+
+    params = {'n_estimators': 100}
+    if param_grid:
+        print(f"Searching {param_grid} with {n_folds}-fold CV on {n_jobs} workers")
+        report['search'] = _search(X_train, y_train, param_grid, n_folds, n_jobs, random_state)
+        params = min(report['search'], key=lambda result: result['cv']['mae'])['params']
+
+    print(f"Training final model {params} on {n_jobs} cores")
+    start = time.perf_counter()
+    model = RandomForestRegressor(random_state=random_state, n_jobs=n_jobs, **params)
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+    model.set_params(n_jobs=None)
+
+    report['final'] = {
+        'params': params,
+        'fit_seconds': fit_seconds,
+        'peak_memory_mb': _peak_memory_mb(),
+        'holdout': _regression_metrics(y_test, model.predict(X_test)) if len(y_test) else None
+    }
+    holdout = report['final']['holdout']
+    if holdout:
+        print(f"Holdout MAE {holdout['mae']:,.0f}  RMSE {holdout['rmse']:,.0f}  MAPE {holdout['mape']:.2f}%  "
+              f"R2 {holdout['r2']:.4f}  (fit {fit_seconds:.1f}s, peak {_format_mb(report['final']['peak_memory_mb'])})")
+
+    joblib.dump({
+        'model': model,
+        'encoder': encoder,
+        'scaler': scaler,
+        'cat_cols': cat_cols,
+        'num_cols': num_cols
+    }, output_path)
+    print(f"Model saved to {output_path}")
+
+    if artifact_path:
+        save_flat_artifact(artifact_path, FlatForest.from_sklearn(model), plan)
+        print(f"Flat artifact saved to {artifact_path}")
+
+    return report
+
+
+def _parse_depth(value):
+    return None if value.lower() == 'none' else int(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train the house price model')
+    parser.add_argument('--n-samples', type=int, default=2000, help='Synthetic rows to train on')
+    parser.add_argument('--source', help='Chunked dataset directory to train on instead')
+    parser.add_argument('--search', action='store_true', help='Cross-validate a grid of configurations')
+    parser.add_argument('--n-estimators', type=int, nargs='+', default=[50, 100, 200], help='Tree counts to search')
+    parser.add_argument('--max-depth', type=_parse_depth, nargs='+', default=[None, 12, 20],
+                        help="Depths to search ('none' for unlimited)")
+    parser.add_argument('--folds', type=int, default=3, help='Cross-validation folds')
+    parser.add_argument('--jobs', type=int, default=-1, help='Cores / worker processes (-1 = all)')
+    parser.add_argument('--test-size', type=float, default=0.2, help='Holdout share')
+    parser.add_argument('--chunk-size', type=int, default=500_000, help='Rows per streamed chunk')
+    parser.add_argument('--output', default=MODEL_PATH, help='Output joblib path')
+    parser.add_argument('--artifact', help='Also write a flat artifact to this path')
+    parser.add_argument('--report', help='Write the JSON report to this path')
+    args = parser.parse_args()
+
+    param_grid = {'n_estimators': args.n_estimators, 'max_depth': args.max_depth} if args.search else None
+    start = time.perf_counter()
+    report = run_training(
+        n_samples=args.n_samples, source=args.source, param_grid=param_grid, n_folds=args.folds,
+        n_jobs=args.jobs, test_size=args.test_size, chunk_size=args.chunk_size,
+        output_path=args.output, artifact_path=args.artifact
+    )
+    report['wall_seconds'] = time.perf_counter() - start
+    print(f"Done in {report['wall_seconds']:.1f}s")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class PredictionCache:
+    def __init__(self, max_size=4096, ttl_seconds=3600.0, model_version=None):
+        """
+        Bounded, thread-safe LRU cache for model scores.
+
+        Entries are keyed on the canonical feature tuple together with the
+        model version that produced them, so switching models never serves
+        stale scores; set_model_version also drops the old entries at once.
+
+        Args:
+            max_size: Maximum number of entries kept; least recently used go first
+            ttl_seconds: Age after which an entry is treated as a miss (None for no expiry)
+            model_version: Version of the model whose scores are cached
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = int(max_size)
+        self.ttl = ttl_seconds
+        self.model_version = model_version
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key, model_version=None):
+        """
+        Return the cached value for key, or None on a miss.
+
+        Args:
+            key: Canonical feature tuple
+            model_version: Version the caller is scoring with; a lookup for any
+                version other than the cache's current one is a miss
+        """
+        now = time.monotonic()
+        with self._lock:
+            if model_version is not None and model_version != self.model_version:
+                self.misses += 1
+                return None
+            full_key = (self.model_version, key)
+            entry = self._entries.get(full_key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at is not None and now >= expires_at:
+                del self._entries[full_key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(full_key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, model_version=None):
+        """
+        Store value for key.
+
+        Args:
+            key: Canonical feature tuple
+            value: Value to cache
+            model_version: Version that produced the value; ignored if it is no
+                longer the cache's current version
+        """
+        expires_at = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            if model_version is not None and model_version != self.model_version:
+                return
+            full_key = (self.model_version, key)
+            self._entries[full_key] = (value, expires_at)
+            self._entries.move_to_end(full_key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def set_model_version(self, model_version):
+        """Switch to a new model version, dropping every entry of the old one"""
+        with self._lock:
+            if model_version != self.model_version:
+                self.model_version = model_version
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss/eviction counters and current occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'model_version': self.model_version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
@@ -1,27 +1,375 @@
+import math
 import numpy as np
-import pandas as pd
 from flask import jsonify
 import logging
+import threading
+import time
+from contextlib import contextmanager
+from feature_plan import FeaturePlan
+from flat_forest import FlatForest
+from metrics import MODEL_LOAD_SECONDS, record_error, stage
+from micro_batcher import MicroBatcher
+from model_artifact import load_flat_artifact
+from prediction_cache import PredictionCache
+from trend_data import generate_trend_data, generate_trend_series
+from validation import FIELD_COLUMNS, SWEEP_CATEGORY_FIELDS, sweep_axis_length
 
-class PredictionService:
-    def __init__(self, model, encoder, scaler, cat_cols, num_cols):
+def load_model_file(path):
+    """
+    Read a flat artifact (.hwf) or a joblib model saved by train_model.
+    
+    Returns:
+        dict of ModelState/PredictionService arguments: model, encoder, scaler,
+        cat_cols, num_cols and plan (None for joblib models)
+    """
+    if path.endswith('.hwf'):
+        forest, plan, _ = load_flat_artifact(path)
+        return {'model': forest, 'encoder': None, 'scaler': None,
+                'cat_cols': plan.cat_cols, 'num_cols': plan.num_cols, 'plan': plan}
+    
+    # Imported here so that artifact-only workers never load sklearn
+    import joblib
+    components = joblib.load(path)
+    return {name: components[name] for name in ('model', 'encoder', 'scaler', 'cat_cols', 'num_cols')}
+
+
+def _rounded_prices(values):
+    """Nested lists of whole prices from a float array, with NaN as None"""
+    missing = np.isnan(values)
+    rounded = np.rint(np.where(missing, 0, values)).astype(np.int64).astype(object)
+    rounded[missing] = None
+    return rounded.tolist()
+
+
+class ModelState:
+    def __init__(self, model, encoder, scaler, cat_cols, num_cols, flat_forest=False, plan=None,
+                 confidence_mode='forest', interval_quantiles=(0.05, 0.95), version=None):
         """
-        Initialize the prediction service with the trained model and preprocessing components.
+        Everything needed to score with one model version.
+        
+        A state is never modified after construction. PredictionService swaps
+        whole states, and each request uses the single state it picked up, so a
+        reload can never mix the preprocessing of one model with the forest of
+        another. In-flight requests are counted so that a retired state can be
+        drained before it is dropped.
         
         Args:
-            model: Trained machine learning model
-            encoder: One-hot encoder for categorical features
-            scaler: Scaler for numerical features
+            model: Trained machine learning model (or a FlatForest)
+            encoder: One-hot encoder for categorical features (None with a plan)
+            scaler: Scaler for numerical features (None with a plan)
             cat_cols: List of categorical column names
             num_cols: List of numerical column names
+            flat_forest: Score with a FlatForest compiled from the model
+            plan: Precompiled FeaturePlan; built from encoder and scaler if omitted
+            confidence_mode: 'forest' or 'heuristic', see PredictionService
+            interval_quantiles: Lower and upper tree quantiles for priceRange
+            version: Identifier of the model
         """
         self.model = model
         self.encoder = encoder
         self.scaler = scaler
         self.cat_cols = cat_cols
         self.num_cols = num_cols
+        self.plan = plan if plan is not None else FeaturePlan.from_fitted(encoder, scaler, cat_cols, num_cols)
+        if flat_forest and not isinstance(model, FlatForest):
+            self.predictor = FlatForest.from_sklearn(model)
+        else:
+            self.predictor = model
+        
+        self.interval_quantiles = list(interval_quantiles)
+        # Per-tree predictions need the flattened forest
+        if confidence_mode == 'forest':
+            self.forest = self.predictor if isinstance(self.predictor, FlatForest) else FlatForest.from_sklearn(model)
+        else:
+            self.forest = None
+        self.version = version
+        
+        self._in_flight = 0
+        self._idle = threading.Condition()
+    
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        """
+        Load a state from a flat artifact (.hwf) or a joblib model saved by
+        train_model. Extra keyword arguments are passed to the constructor.
+        """
+        return cls(**load_model_file(path), **kwargs)
+    
+    def score_matrix(self, X_processed):
+        """
+        Score preprocessed rows.
+        
+        Returns:
+            Array of shape (n_rows, 1) holding the predicted price, or in
+            'forest' mode (n_rows, 4) holding price, lower bound, upper bound
+            and confidence, all from one vectorized pass over every tree
+        """
+        if self.forest is None:
+            return self.predictor.predict(X_processed)[:, np.newaxis]
+        
+        per_tree = self.forest.predict_per_tree(X_processed)
+        price = per_tree.mean(axis=0)
+        lower, upper = np.quantile(per_tree, self.interval_quantiles, axis=0)
+        # Full confidence for a zero-width interval, dropping with its relative half-width
+        confidence = np.clip(100 * (1 - (upper - lower) / (2 * price)), 0, 100)
+        return np.column_stack([price, lower, upper, confidence])
+    
+    def warm(self, n_rows=64):
+        """
+        Fault in the model before it takes traffic: read every node array once
+        (pages of a memory-mapped artifact) and run a throwaway batch.
+        """
+        forests = {id(f): f for f in (self.predictor, self.forest) if isinstance(f, FlatForest)}
+        for forest in forests.values():
+            for array in forest.to_arrays().values():
+                np.add.reduce(array, axis=None)
+        self.score_matrix(np.zeros((n_rows, self.plan.n_features)))
+    
+    def acquire(self):
+        """Mark one request as using this state"""
+        with self._idle:
+            self._in_flight += 1
+    
+    def release(self):
+        """Mark a request started with acquire as finished"""
+        with self._idle:
+            self._in_flight -= 1
+            if self._in_flight == 0:
+                self._idle.notify_all()
+    
+    @property
+    def in_flight(self):
+        return self._in_flight
+    
+    def wait_drained(self, timeout=None):
+        """Block until no request is using this state; False on timeout"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._in_flight == 0, timeout)
+
+
+class PredictionService:
+    def __init__(self, model, encoder, scaler, cat_cols, num_cols, flat_forest=False, plan=None,
+                 confidence_mode='forest', interval_coverage=0.9, model_version=None):
+        """
+        Initialize the prediction service with the trained model and preprocessing components.
+        
+        Args:
+            model: Trained machine learning model
+            encoder: One-hot encoder for categorical features
+            scaler: Scaler for numerical features
+            cat_cols: List of categorical column names
+            num_cols: List of numerical column names
+            flat_forest: Score with a FlatForest compiled from the model instead
+                of calling model.predict (faster for batches below ~500 rows)
+            plan: Precompiled FeaturePlan; built from encoder and scaler if omitted
+            confidence_mode: 'forest' derives confidence and priceRange from the
+                spread of the individual tree predictions; 'heuristic' uses the
+                fixed input checks in _calculate_confidence
+            interval_coverage: Central share of tree predictions covered by
+                priceRange in 'forest' mode
+            model_version: Identifier of the loaded model; reported with every
+                prediction and tied to cached scores
+        """
+        if confidence_mode not in ('forest', 'heuristic'):
+            raise ValueError(f"Unknown confidence mode: {confidence_mode}")
+        if not 0 < interval_coverage < 1:
+            raise ValueError("interval_coverage must be between 0 and 1")
+        self.flat_forest = flat_forest
+        self.confidence_mode = confidence_mode
+        self.interval_quantiles = [(1 - interval_coverage) / 2, (1 + interval_coverage) / 2]
+        self._state = ModelState(
+            model, encoder, scaler, cat_cols, num_cols, plan=plan, version=model_version,
+            **self._state_options()
+        )
+        self._swap_lock = threading.Lock()
+        self.batcher = None
+        self.cache = None
         self.logger = logging.getLogger(__name__)
     
+    @classmethod
+    def from_artifact(cls, path, **kwargs):
+        """
+        Create a service from a flat artifact written by model_artifact.
+        
+        The forest is memory-mapped and served by FlatForest, so neither
+        sklearn nor the fitted encoder/scaler objects are needed. Extra
+        keyword arguments are passed to the constructor.
+        """
+        forest, plan, _ = load_flat_artifact(path)
+        return cls(forest, None, None, plan.cat_cols, plan.num_cols, plan=plan, **kwargs)
+    
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        """Create a service from a flat artifact (.hwf) or a joblib model"""
+        return cls(**load_model_file(path), **kwargs)
+    
+    # The current state's components, for callers that inspect the model
+    model = property(lambda self: self._state.model)
+    encoder = property(lambda self: self._state.encoder)
+    scaler = property(lambda self: self._state.scaler)
+    cat_cols = property(lambda self: self._state.cat_cols)
+    num_cols = property(lambda self: self._state.num_cols)
+    plan = property(lambda self: self._state.plan)
+    predictor = property(lambda self: self._state.predictor)
+    forest = property(lambda self: self._state.forest)
+    model_version = property(lambda self: self._state.version)
+    
+    def _state_options(self):
+        return {
+            'flat_forest': self.flat_forest,
+            'confidence_mode': self.confidence_mode,
+            'interval_quantiles': self.interval_quantiles
+        }
+    
+    def load_state(self, path, model_version=None):
+        """Load a model file into a ModelState configured like this service"""
+        return ModelState.from_file(path, version=model_version, **self._state_options())
+    
+    def swap_model(self, state, drain_timeout=30.0):
+        """
+        Make state the model serving new requests.
+        
+        The reference is replaced atomically; requests already running finish
+        on the old state, which is then drained. Cached scores of the old
+        version are dropped.
+        
+        Args:
+            state: ModelState to serve, ideally warmed already
+            drain_timeout: Seconds to wait for in-flight requests on the old state
+        
+        Returns:
+            True if the old state drained within drain_timeout
+        """
+        with self._swap_lock:
+            old, self._state = self._state, state
+            cache = self.cache
+            if cache is not None:
+                cache.set_model_version(state.version)
+        self.logger.info(f"Model {old.version} replaced by {state.version}, draining {old.in_flight} requests")
+        
+        drained = old.wait_drained(drain_timeout)
+        if not drained:
+            self.logger.warning(f"Model {old.version} still has {old.in_flight} requests after {drain_timeout}s")
+        return drained
+    
+    def reload(self, path, model_version=None, drain_timeout=30.0):
+        """
+        Load, warm and swap in a new model without interrupting traffic.
+        
+        Loading and warming happen on the calling thread while the current
+        model keeps serving, so call this from a background thread.
+        
+        Returns:
+            True if the old model drained within drain_timeout
+        """
+        start = time.perf_counter()
+        state = self.load_state(path, model_version)
+        state.warm()
+        MODEL_LOAD_SECONDS.set(time.perf_counter() - start)
+        return self.swap_model(state, drain_timeout)
+    
+    @contextmanager
+    def _serving(self):
+        """Pin the current state for the duration of one request"""
+        state = self._state
+        state.acquire()
+        try:
+            yield state
+        finally:
+            state.release()
+    
+    def enable_micro_batching(self, max_latency_ms=2.0, max_batch_size=64):
+        """
+        Route single-row predictions through a shared MicroBatcher so that
+        concurrent requests are scored together in one model call.
+        
+        Args:
+            max_latency_ms: Longest time a request waits for others to join its batch
+            max_batch_size: Largest number of rows scored in one call
+        """
+        self.disable_micro_batching()
+        self.batcher = MicroBatcher(self._score_matrix, max_latency_ms, max_batch_size)
+    
+    def disable_micro_batching(self):
+        """Go back to one model call per request"""
+        if self.batcher is not None:
+            batcher, self.batcher = self.batcher, None
+            batcher.close()
+    
+    def enable_cache(self, max_size=4096, ttl_seconds=3600.0):
+        """
+        Cache scores per canonical input so repeat valuations skip
+        preprocessing and forest evaluation.
+        
+        Only the model scores are cached; the response is rebuilt from them
+        on every hit, with the same trendData since it is seeded by the key.
+        
+        Args:
+            max_size: Maximum number of cached inputs
+            ttl_seconds: Lifetime of an entry (None for no expiry)
+        """
+        self.cache = PredictionCache(max_size, ttl_seconds, self.model_version)
+    
+    def disable_cache(self):
+        """Stop caching scores"""
+        self.cache = None
+    
+    def _input_key(self, input_data):
+        """Canonical key for a parsed record (cache key and trend seed); _parse_input fixes field order and types"""
+        return tuple(input_data.values())
+    
+    def _score_row(self, input_data, state):
+        """Score one parsed record, consulting the cache if enabled"""
+        cache = self.cache
+        if cache is not None:
+            key = self._input_key(input_data)
+            with stage('cache_lookup'):
+                scores = cache.get(key, state.version)
+            if scores is not None:
+                return scores
+        
+        with stage('preprocess'):
+            X_processed = state.plan.transform_row(input_data)
+        with stage('model_predict'):
+            scores = self._predict_one(X_processed, state)
+        if cache is not None:
+            cache.put(key, scores, state.version)
+        return scores
+    
+    def _score_rows(self, rows, state):
+        """Score parsed records as one matrix, skipping those already cached"""
+        cache = self.cache
+        if cache is None:
+            with stage('batch_preprocess'):
+                X_processed = state.plan.transform_many(rows)
+            with stage('batch_model_predict'):
+                return state.score_matrix(X_processed).tolist()
+        
+        keys = [self._input_key(row) for row in rows]
+        with stage('batch_cache_lookup'):
+            scores = [cache.get(key, state.version) for key in keys]
+        missing = [j for j, row_scores in enumerate(scores) if row_scores is None]
+        if missing:
+            with stage('batch_preprocess'):
+                X_processed = state.plan.transform_many([rows[j] for j in missing])
+            with stage('batch_model_predict'):
+                missing_scores = state.score_matrix(X_processed).tolist()
+            for j, row_scores in zip(missing, missing_scores):
+                scores[j] = row_scores
+                cache.put(keys[j], row_scores, state.version)
+        return scores
+    
+    def _score_matrix(self, X_processed, state=None):
+        """Score preprocessed rows with state (the current model by default), see ModelState.score_matrix"""
+        return (state or self._state).score_matrix(X_processed)
+    
+    def _predict_one(self, X_processed, state):
+        """Score a single preprocessed row, coalescing with other requests if enabled"""
+        batcher = self.batcher
+        if batcher is not None:
+            return batcher.predict(X_processed[0], state)
+        return state.score_matrix(X_processed)[0].tolist()
+    
     def _preprocess_data(self, input_data):
         """Preprocess input data for prediction"""
         try:
@@ -37,25 +385,72 @@ class PredictionService:
             self.logger.error(f"Error preprocessing data: {str(e)}")
             raise ValueError(f"Failed to preprocess data: {str(e)}")
 
-    def _generate_trend_data(self, predicted_price):
-        """Generate historical trend data"""
-        current_month = pd.Timestamp.now().month
-        trend_data = []
-        
-        for i in range(12):
-            month_idx = (current_month - 11 + i) % 12 + 1
-            month_name = pd.Timestamp(2023, month_idx, 1).strftime('%b')
-            
-            # Calculate historical value with some randomness but maintain trend
-            variance = predicted_price * (np.random.uniform(-0.05, 0.1))
-            historical_price = predicted_price - variance + (i * predicted_price * 0.01)  # Slight upward trend
+    def _generate_trend_data(self, predicted_price, input_data):
+        """Generate historical trend data, seeded by the canonical input so it is reproducible"""
+        return generate_trend_data(predicted_price, self._input_key(input_data))
+    
+    def _parse_input(self, data):
+        """Convert request fields to the column names and types used in training"""
+        return {
+            'bedrooms': float(data['bedrooms']),
+            'bathrooms': float(data['bathrooms']),
+            'square_feet': float(data['squareFeet']),
+            'lot_size': float(data['lotSize']),
+            'year_built': int(data['yearBuilt']),
+            'neighborhood': str(data['neighborhood']),
+            'condition': str(data['condition']),
+            'has_garage': 1 if data['hasGarage'] else 0,
+            'has_pool': 1 if data['hasPool'] else 0
+        }
+    
+    def _build_response(self, input_data, scores, trend_data=None, model_version=None):
+        """
+        Build the success payload for one parsed record and its row from
+        _score_matrix. trend_data is generated here unless precomputed.
+        """
+        predicted_price = scores[0]
+        
+        # Validate prediction
+        if not (10000 <= predicted_price <= 10000000):
+            raise ValueError("Prediction out of reasonable range")
+        
+        if len(scores) > 1:
+            # Spread of the individual tree predictions
+            _, lower_bound, upper_bound, confidence = scores
+        else:
+            # Calculate confidence based on input data quality
+            confidence = self._calculate_confidence(input_data, predicted_price)
             
-            trend_data.append({
-                'month': month_name,
-                'price': round(historical_price)
-            })
+            # Calculate price range
+            margin = 0.05 + (1 - confidence/100) * 0.05  # Wider range for lower confidence
+            lower_bound = predicted_price * (1 - margin)
+            upper_bound = predicted_price * (1 + margin)
         
-        return trend_data
+        # Generate trend data
+        if trend_data is None:
+            with stage('trend'):
+                trend_data = self._generate_trend_data(predicted_price, input_data)
+        
+        return {
+            'status': 'success',
+            'prediction': {
+                'predictedPrice': round(predicted_price),
+                'confidence': round(confidence, 1),
+                'priceRange': {
+                    'lower': round(lower_bound),
+                    'upper': round(upper_bound)
+                },
+                'pricePerSqFt': round(predicted_price / input_data['square_feet']),
+                'trendData': trend_data
+            },
+            'inputSummary': {
+                'propertySize': f"{input_data['square_feet']:,.0f} sq ft",
+                'bedBath': f"{input_data['bedrooms']:.0f} bed, {input_data['bathrooms']:.1f} bath",
+                'yearBuilt': str(input_data['year_built']),
+                'location': str(input_data['neighborhood']).title()
+            },
+            'modelVersion': model_version
+        }
     
     def predict(self, data):
         """
@@ -67,87 +462,262 @@ class PredictionService:
         Returns:
             JSON response with prediction results
         """
+        payload, status, model_version = self.predict_payload(data)
+        with stage('jsonify'):
+            response = jsonify(payload)
+        response.status_code = status
+        if model_version is not None:
+            response.headers['X-Model-Version'] = str(model_version)
+        return response
+    
+    def predict_payload(self, data):
+        """
+        Framework-independent core of predict.
+        
+        Returns:
+            tuple: (payload dict, HTTP status, version of the model that scored
+            it or None if the input was rejected before scoring)
+        """
         try:
-            # Convert to DataFrame with expected columns
-            input_data = pd.DataFrame({
-                'bedrooms': [float(data['bedrooms'])],
-                'bathrooms': [float(data['bathrooms'])],
-                'square_feet': [float(data['squareFeet'])],
-                'lot_size': [float(data['lotSize'])],
-                'year_built': [int(data['yearBuilt'])],
-                'neighborhood': [str(data['neighborhood'])],
-                'condition': [str(data['condition'])],
-                'has_garage': [1 if data['hasGarage'] else 0],
-                'has_pool': [1 if data['hasPool'] else 0]
-            })
+            # Parse into the training column layout
+            with stage('parse'):
+                input_data = self._parse_input(data)
             
             try:
-                # Preprocess data
-                X_processed = self._preprocess_data(input_data)
+                # Preprocess data and make prediction
+                with self._serving() as state:
+                    scores = self._score_row(input_data, state)
                 
-                # Make prediction
-                predicted_price = float(self.model.predict(X_processed)[0])
-                
-                # Validate prediction
-                if not (10000 <= predicted_price <= 10000000):
-                    raise ValueError("Prediction out of reasonable range")
-                
-                # Calculate confidence based on input data quality
-                confidence = self._calculate_confidence(input_data, predicted_price)
-                
-                # Calculate price range
-                margin = 0.05 + (1 - confidence/100) * 0.05  # Wider range for lower confidence
-                lower_bound = predicted_price * (1 - margin)
-                upper_bound = predicted_price * (1 + margin)
-                
-                # Generate trend data
-                trend_data = self._generate_trend_data(predicted_price)
-                
-                # Prepare response
-                response = {
-                    'status': 'success',
-                    'prediction': {
-                        'predictedPrice': round(predicted_price),
-                        'confidence': round(confidence, 1),
-                        'priceRange': {
-                            'lower': round(lower_bound),
-                            'upper': round(upper_bound)
-                        },
-                        'pricePerSqFt': round(predicted_price / float(input_data['square_feet'][0])),
-                        'trendData': trend_data
-                    },
-                    'inputSummary': {
-                        'propertySize': f"{input_data['square_feet'][0]:,.0f} sq ft",
-                        'bedBath': f"{input_data['bedrooms'][0]:.0f} bed, {input_data['bathrooms'][0]:.1f} bath",
-                        'yearBuilt': str(input_data['year_built'][0]),
-                        'location': str(input_data['neighborhood'][0]).title()
-                    }
-                }
-                
-                return jsonify(response)
+                return self._build_response(input_data, scores, model_version=state.version), 200, state.version
                 
             except Exception as e:
+                record_error('prediction', e)
                 self.logger.error(f"Prediction processing error: {str(e)}")
-                return jsonify({
+                return {
                     'status': 'error',
                     'error': f"Failed to process prediction: {str(e)}"
-                }), 500
+                }, 500, None
                 
         except Exception as e:
+            record_error('invalid_input', e)
             self.logger.error(f"Input data error: {str(e)}")
-            return jsonify({
+            return {
                 'status': 'error',
                 'error': f"Invalid input data: {str(e)}"
-            }), 400
+            }, 400, None
+    
+    def predict_many(self, items):
+        """
+        Make price predictions for many properties with a single model call.
+        
+        Items are parsed individually so that one bad record only fails its
+        own entry; all valid records are preprocessed as one matrix and
+        scored together.
+        
+        Args:
+            items: List of dictionaries with property features
+            
+        Returns:
+            List with one result dict per item, in input order. Successful
+            entries have the same shape as a single prediction response,
+            failed entries are {'status': 'error', 'error': message}.
+        """
+        results = [None] * len(items)
+        rows = []
+        positions = []
+        
+        for i, data in enumerate(items):
+            try:
+                rows.append(self._parse_input(data))
+                positions.append(i)
+            except Exception as e:
+                record_error('invalid_input', e)
+                results[i] = {'status': 'error', 'error': f"Invalid input data: {str(e)}"}
+        
+        if rows:
+            try:
+                with self._serving() as state:
+                    scores = self._score_rows(rows, state)
+            except Exception as e:
+                record_error('prediction', e)
+                self.logger.error(f"Batch prediction processing error: {str(e)}")
+                error = {'status': 'error', 'error': f"Failed to process prediction: {str(e)}"}
+                for i in positions:
+                    results[i] = dict(error)
+                return results
+            
+            with stage('batch_trend'):
+                trend_series = generate_trend_series(
+                    [row_scores[0] for row_scores in scores],
+                    [self._input_key(input_data) for input_data in rows]
+                )
+            for i, input_data, row_scores, trend_data in zip(positions, rows, scores, trend_series):
+                try:
+                    results[i] = self._build_response(input_data, row_scores, trend_data, state.version)
+                except Exception as e:
+                    record_error('prediction', e)
+                    results[i] = {'status': 'error', 'error': f"Failed to process prediction: {str(e)}"}
+        
+        return results
+
+    def score_frame(self, frame):
+        """
+        Score a DataFrame of validated records (training column names) as one
+        matrix, for offline bulk scoring.
+        
+        Returns:
+            dict of arrays: predicted_price, price_lower, price_upper, confidence
+            and error (None, or a message for out-of-range predictions)
+        """
+        with self._serving() as state:
+            scores = state.score_matrix(state.plan.transform_frame(frame))
+        price = scores[:, 0]
+        out_of_range = ~((price >= 10000) & (price <= 10000000))
+        
+        if scores.shape[1] > 1:
+            lower, upper, confidence = scores[:, 1], scores[:, 2], scores[:, 3]
+        else:
+            # Same rules as _calculate_confidence, applied to the whole column
+            square_feet = frame['square_feet'].to_numpy(dtype=np.float64)
+            year_built = frame['year_built'].to_numpy(dtype=np.float64)
+            confidence = np.full(len(price), 90.0)
+            confidence -= 5 * ((square_feet < 100) | (square_feet > 10000))
+            confidence -= 5 * (year_built < 1900)
+            confidence -= 10 * out_of_range
+            confidence = np.clip(confidence, 60, 95)
+            margin = 0.05 + (1 - confidence/100) * 0.05
+            lower = price * (1 - margin)
+            upper = price * (1 + margin)
+        
+        return {
+            'predicted_price': np.rint(price),
+            'price_lower': np.rint(lower),
+            'price_upper': np.rint(upper),
+            'confidence': np.round(confidence, 1),
+            'error': np.where(out_of_range, "Failed to process prediction: Prediction out of reasonable range", None)
+        }
+
+    def sweep_categories(self, state=None):
+        """Values "all" expands to for each category field of a sweep, from state (the current model by default)"""
+        plan = (state or self._state).plan
+        categories = {}
+        for field in SWEEP_CATEGORY_FIELDS:
+            column = FIELD_COLUMNS[field]
+            if column in plan.cat_cols:
+                categories[field] = list(plan.categories[plan.cat_cols.index(column)])
+            else:
+                categories[field] = [False, True]
+        return categories
+    
+    def _sweep_values(self, house, field, spec, categories):
+        """Request-typed and parsed values of one sweep axis, without repeats"""
+        if spec == 'all':
+            values = categories[field]
+        elif 'values' in spec:
+            values = spec['values']
+        else:
+            values = np.linspace(float(spec['start']), float(spec['stop']), int(spec['num'])).tolist()
+            if field == 'yearBuilt':
+                values = [round(value) for value in values]
+        
+        # Parse through the base house so every value gets exactly the /predict conversion
+        column = FIELD_COLUMNS[field]
+        parsed = {}
+        for value in values:
+            parsed.setdefault(self._parse_input(dict(house, **{field: value}))[column], value)
+        return list(parsed.values()), list(parsed)
+
+    def sweep(self, house, sweep, max_points=2500):
+        """
+        What-if price curve: score a base house with one or more fields varied
+        over a grid, all grid points and the base house in a single model call.
+        
+        With a FlatForest the grid is never materialized: predict_grid walks
+        each tree once for the whole grid, with the base house's own value
+        appended to every axis so that its price comes from the same walk.
+        Otherwise the grid and the base house are built as one feature matrix
+        and scored with score_matrix.
+        
+        Args:
+            house: Base property, a validated /predict body
+            sweep: Dict of request field -> "all" (every known category, or
+                both booleans), {"values": [...]} or, for numeric fields,
+                {"start": a, "stop": b, "num": n} (inclusive, evenly spaced).
+                Axes follow the dict's order.
+            max_points: Largest accepted grid, checked before any value is built
+        
+        Returns:
+            dict: basePrice, the axes with their values, prices (nested lists
+            shaped like the axes) and, per field, marginal price differences
+            between consecutive values along that axis. Grid points outside
+            the range /predict accepts are null in prices and marginal and
+            counted in outOfRange.
+        
+        Raises:
+            ValueError: the input or the sweep is invalid
+            RuntimeError: the base house's own price is out of range, where
+                /predict would fail
+        """
+        input_data = self._parse_input(house)
+        with self._serving() as state:
+            categories = self.sweep_categories(state)
+            requested = math.prod(sweep_axis_length(field, spec, categories) for field, spec in sweep.items())
+            if requested > max_points:
+                raise ValueError(f"Sweep too large: {requested} points, at most {max_points} per request")
+            
+            axes = [(field, *self._sweep_values(house, field, spec, categories)) for field, spec in sweep.items()]
+            shape = tuple(len(values) for _, values, _ in axes)
+            n_points = int(np.prod(shape))
+            
+            columns = [(FIELD_COLUMNS[field], parsed) for field, _, parsed in axes]
+            forest = state.forest if state.forest is not None else state.predictor
+            if isinstance(forest, FlatForest):
+                with stage('sweep_preprocess'):
+                    base, blocks = state.plan.grid_axes(input_data, columns)
+                    # One extra point per axis holding the base house's value;
+                    # the last corner of the extended grid is the base house
+                    blocks = [(cols, np.vstack([values, base[cols]])) for cols, values in blocks]
+                with stage('sweep_model_predict'):
+                    extended = forest.predict_grid(base, blocks)
+                grid, base_price = extended[(slice(-1),) * len(shape)], extended[(-1,) * len(shape)]
+            else:
+                with stage('sweep_preprocess'):
+                    # Base house last, so it is scored in the same call
+                    X_processed = np.vstack([
+                        state.plan.transform_grid(input_data, columns), state.plan.transform_row(input_data)
+                    ])
+                with stage('sweep_model_predict'):
+                    prices = state.score_matrix(X_processed)[:, 0]
+                grid, base_price = prices[:-1].reshape(shape), prices[-1]
+        
+        # Same sanity check as /predict, per point; NaN carries into marginal
+        if not (10000 <= base_price <= 10000000):
+            raise RuntimeError("Prediction out of reasonable range")
+        out_of_range = ~((grid >= 10000) & (grid <= 10000000))
+        grid = np.where(out_of_range, np.nan, grid)
+        
+        return {
+            'status': 'success',
+            'basePrice': round(float(base_price)),
+            'axes': [{'feature': field, 'values': values} for field, values, _ in axes],
+            'points': n_points,
+            'prices': _rounded_prices(grid),
+            'marginal': {
+                field: _rounded_prices(np.diff(grid, axis=k))
+                for k, (field, _, _) in enumerate(axes)
+            },
+            'outOfRange': int(out_of_range.sum()),
+            'modelVersion': state.version
+        }
 
     def _calculate_confidence(self, input_data, predicted_price):
         """Calculate confidence score based on input data quality"""
         confidence = 90  # Base confidence
         
         # Adjust confidence based on data quality
-        if input_data['square_feet'][0] < 100 or input_data['square_feet'][0] > 10000:
+        if input_data['square_feet'] < 100 or input_data['square_feet'] > 10000:
             confidence -= 5
-        if input_data['year_built'][0] < 1900:
+        if input_data['year_built'] < 1900:
             confidence -= 5
         if predicted_price < 10000 or predicted_price > 10000000:
             confidence -= 10
@@ -0,0 +1,39 @@
+import os
+import sys
+
+import joblib
+import pytest
+
+# The backend modules are flat and import each other by name
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import model_trainer
+from prediction_service import PredictionService
+
+
+@pytest.fixture(scope='session')
+def model_path(tmp_path_factory):
+    """model.joblib written by train_model into a temporary directory"""
+    directory = tmp_path_factory.mktemp('model')
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        model_trainer.train_model()
+    finally:
+        os.chdir(cwd)
+    return str(directory / model_trainer.MODEL_PATH)
+
+
+@pytest.fixture(scope='session')
+def components(model_path):
+    """model, encoder, scaler, cat_cols and num_cols of the trained model"""
+    return joblib.load(model_path)
+
+
+@pytest.fixture
+def make_service(components):
+    """Build a PredictionService around the trained model"""
+    def make(**kwargs):
+        return PredictionService(**components, **kwargs)
+    return make
@@ -0,0 +1,81 @@
+import time
+
+import numpy as np
+import pytest
+
+from data_generator import generate_synthetic_data
+from feature_plan import FeaturePlan
+
+REQUEST = {
+    'bedrooms': 3, 'bathrooms': 2, 'squareFeet': 1800, 'lotSize': 0.25, 'yearBuilt': 1995,
+    'neighborhood': 'midtown', 'condition': 'good', 'hasGarage': True, 'hasPool': False
+}
+
+
+@pytest.fixture(scope='module')
+def X(components):
+    plan = FeaturePlan.from_fitted(
+        components['encoder'], components['scaler'], components['cat_cols'], components['num_cols']
+    )
+    return plan.transform_frame(generate_synthetic_data(500).drop('price', axis=1))
+
+
+def check_bounds(scores):
+    price, lower, upper, confidence = scores.T
+    assert np.all(lower <= price)
+    assert np.all(price <= upper)
+    assert np.all((0 <= confidence) & (confidence <= 100))
+
+
+@pytest.mark.parametrize('flat_forest', [False, True])
+def test_forest_mode_bounds_batch(make_service, X, flat_forest):
+    state = make_service(flat_forest=flat_forest)._state
+    scores = state.score_matrix(X)
+    assert scores.shape == (len(X), 4)
+    check_bounds(scores)
+    # The price is the forest's own prediction
+    assert np.allclose(scores[:, 0], state.model.predict(X))
+
+
+def test_forest_mode_bounds_single_rows(make_service, X):
+    state = make_service()._state
+    batch = state.score_matrix(X)
+    for i in range(0, len(X), 25):
+        single = state.score_matrix(X[i:i + 1])
+        check_bounds(single)
+        assert np.allclose(single[0], batch[i])
+
+
+def test_forest_mode_response(make_service):
+    payload, status, _ = make_service().predict_payload(REQUEST)
+    assert status == 200
+    prediction = payload['prediction']
+    assert prediction['priceRange']['lower'] <= prediction['predictedPrice'] <= prediction['priceRange']['upper']
+    assert 0 <= prediction['confidence'] <= 100
+
+
+def test_heuristic_mode_keeps_fixed_margin(make_service):
+    service = make_service(confidence_mode='heuristic')
+    assert service._state.score_matrix(service.plan.transform_row(service._parse_input(REQUEST))).shape == (1, 1)
+
+    payload, status, _ = service.predict_payload(REQUEST)
+    assert status == 200
+    prediction = payload['prediction']
+    price = service.model.predict(service.plan.transform_row(service._parse_input(REQUEST)))[0]
+    # Clean input: confidence 90, so the range is +/-5.5%
+    assert prediction['confidence'] == 90
+    assert prediction['priceRange'] == {'lower': round(price * 0.945), 'upper': round(price * 1.055)}
+
+
+def test_single_row_latency_budget(make_service, X):
+    state = make_service()._state
+    state.warm()
+    latencies = []
+    for i in range(300):
+        start = time.perf_counter()
+        state.score_matrix(X[i:i + 1])
+        latencies.append((time.perf_counter() - start) * 1000)
+    p50, p99 = np.percentile(latencies, [50, 99])
+    # Typically 0.25 ms and 0.7 ms; the bounds only catch order-of-magnitude regressions
+    assert p50 < 5, f"p50 {p50:.2f} ms"
+    assert p99 < 25, f"p99 {p99:.2f} ms"
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from data_generator import generate_synthetic_data
+from feature_plan import FeaturePlan
+
+
+@pytest.fixture(scope='module')
+def frame():
+    return generate_synthetic_data(2000).drop('price', axis=1)
+
+
+@pytest.fixture
+def service(make_service):
+    return make_service()
+
+
+def test_transform_row_matches_sklearn_preprocessing(service, frame):
+    plan = service.plan
+    for i, rec in enumerate(frame.to_dict('records')):
+        expected = service._preprocess_data(frame.iloc[[i]])
+        assert np.array_equal(plan.transform_row(rec), expected), f"row {i}: {rec}"
+
+
+def test_transform_many_and_frame_match_transform_row(service, frame):
+    plan = service.plan
+    records = frame.to_dict('records')
+    expected = np.vstack([plan.transform_row(rec) for rec in records])
+    assert np.array_equal(plan.transform_many(records), expected)
+    assert np.array_equal(plan.transform_frame(frame), expected)
+
+
+def test_unknown_neighborhood_encodes_as_all_zeros(service, frame):
+    plan = service.plan
+    rec = dict(frame.iloc[0], neighborhood='atlantis')
+    expected = service._preprocess_data(frame.iloc[[0]].assign(neighborhood='atlantis'))
+
+    row = plan.transform_row(rec)
+    assert np.array_equal(row, expected)
+    assert np.array_equal(plan.transform_many([rec]), expected)
+    neighborhood_columns = slice(len(plan.num_cols), len(plan.num_cols) + len(plan.categories[0]))
+    assert not row[0, neighborhood_columns].any()
+
+
+def test_plan_survives_dict_round_trip(service, frame):
+    plan = FeaturePlan.from_dict(service.plan.to_dict())
+    records = frame.head(50).to_dict('records')
+    assert np.array_equal(plan.transform_many(records), service.plan.transform_many(records))
@@ -0,0 +1,129 @@
+import importlib
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from model_artifact import convert_joblib
+from model_registry import ModelRegistry, ModelReloader
+from prediction_service import PredictionService
+
+ADMIN_TOKEN = 'test-token'
+
+# Largest accepted ratio of p99 latency during swaps to p99 before them;
+# typically 1.5x, so this only catches a stall while the new model loads
+LATENCY_FACTOR = 5
+
+REQUEST = {
+    'bedrooms': 3, 'bathrooms': 2, 'squareFeet': 1800, 'lotSize': 0.25, 'yearBuilt': 1995,
+    'neighborhood': 'midtown', 'condition': 'good', 'hasGarage': True, 'hasPool': False
+}
+
+
+@pytest.fixture
+def registry(model_path, tmp_path):
+    """Registry with v0001 (the joblib model) and v0002 (its flat artifact), v0001 active"""
+    artifact = str(tmp_path / 'model.hwf')
+    convert_joblib(model_path, artifact)
+    registry = ModelRegistry(str(tmp_path / 'models'))
+    registry.publish(model_path)
+    registry.publish(artifact, activate=False)
+    return registry
+
+
+def serve(registry, micro_batching=False):
+    version, path = registry.resolve()
+    service = PredictionService.from_file(path, model_version=version)
+    if micro_batching:
+        service.enable_micro_batching()
+    return service
+
+
+@pytest.fixture
+def app_module(registry, monkeypatch):
+    """app.py imported against the registry, with the cache off so every request is scored"""
+    monkeypatch.setenv('HOUSEWISE_MODEL_REGISTRY', registry.root)
+    monkeypatch.setenv('HOUSEWISE_ADMIN_TOKEN', ADMIN_TOKEN)
+    monkeypatch.setenv('HOUSEWISE_CACHE_SIZE', '0')
+    monkeypatch.delenv('HOUSEWISE_MODEL_WATCH_INTERVAL', raising=False)
+    monkeypatch.delitem(sys.modules, 'app', raising=False)
+    module = importlib.import_module('app')
+    yield module
+    module.prediction_service.disable_micro_batching()
+    sys.modules.pop('app', None)
+
+
+@pytest.mark.parametrize('micro_batching', [False, True])
+def test_reload_under_load_drops_no_requests(app_module, micro_batching):
+    if micro_batching:
+        app_module.prediction_service.enable_micro_batching()
+    stop = threading.Event()
+    results = []
+
+    def client():
+        with app_module.app.test_client() as http:
+            while not stop.is_set():
+                start = time.perf_counter()
+                response = http.post('/predict', json=REQUEST)
+                end = time.perf_counter()
+                body = response.get_json()
+                results.append((start, end, response.status_code,
+                                response.headers.get('X-Model-Version'), body.get('modelVersion')))
+
+    clients = [threading.Thread(target=client) for _ in range(8)]
+    for thread in clients:
+        thread.start()
+    swaps = []
+    try:
+        time.sleep(0.5)
+        with app_module.app.test_client() as admin:
+            for version in ['v0002', 'v0001'] * 3:
+                start = time.perf_counter()
+                response = admin.post('/admin/reload', json={'version': version, 'wait': True},
+                                      headers={'Authorization': f"Bearer {ADMIN_TOKEN}"})
+                swaps.append((start, time.perf_counter()))
+                assert response.status_code == 200, response.get_json()
+                assert response.get_json()['reload']['model_version'] == version
+                time.sleep(0.1)
+    finally:
+        stop.set()
+        for thread in clients:
+            thread.join()
+
+    assert results and all(status == 200 for _, _, status, _, _ in results)
+    # The header and the body name the same model, and both versions served
+    assert all(header == body for _, _, _, header, body in results)
+    assert {body for *_, body in results} == {'v0001', 'v0002'}
+
+    # No latency cliff: requests overlapping a swap stay within a bounded
+    # factor of the steady state before the first one
+    before = [end - start for start, end, *_ in results if end < swaps[0][0]]
+    during = [end - start for start, end, *_ in results
+              if any(start < swap_end and end > swap_start for swap_start, swap_end in swaps)]
+    p99_before, p99_during = np.percentile(before, 99), np.percentile(during, 99)
+    assert p99_during < max(LATENCY_FACTOR * p99_before, 0.05), (
+        f"p99 before {p99_before * 1000:.1f} ms, during swaps {p99_during * 1000:.1f} ms"
+    )
+
+
+def test_watch_retries_when_a_reload_is_running(registry):
+    service = serve(registry)
+    reloader = ModelReloader(service, registry)
+    # Pretend a reload is in progress so the watcher's request is refused
+    reloader._status['state'] = 'loading'
+    reloader.watch(interval=0.01)
+    try:
+        registry.activate('v0002')
+        time.sleep(0.1)
+        assert service.model_version == 'v0001'
+
+        with reloader._lock:
+            reloader._status['state'] = 'idle'
+        deadline = time.monotonic() + 10
+        while service.model_version != 'v0002' and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert service.model_version == 'v0002'
+    finally:
+        reloader.stop()
@@ -0,0 +1,51 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from micro_batcher import MicroBatcher
+
+
+def double(X):
+    return X.sum(axis=1) * 2
+
+
+def test_concurrent_rows_are_batched():
+    batcher = MicroBatcher(double, max_latency_ms=20, max_batch_size=8)
+    try:
+        futures = [batcher.submit(np.array([i, 1.0])) for i in range(16)]
+        assert [future.result(timeout=5) for future in futures] == [(i + 1) * 2 for i in range(16)]
+        assert batcher.stats()['largest_batch'] > 1
+    finally:
+        batcher.close()
+
+
+def test_submit_after_close_raises():
+    batcher = MicroBatcher(double)
+    batcher.close()
+    with pytest.raises(RuntimeError):
+        batcher.submit(np.ones(2))
+
+
+def test_close_racing_submit_never_strands_a_caller():
+    batcher = MicroBatcher(double)
+    # Widen the gap between submit's closed check and its put
+    put = batcher._queue.put
+
+    def slow_put(item, *args, **kwargs):
+        if item is not None:
+            time.sleep(0.1)
+        put(item, *args, **kwargs)
+
+    batcher._queue.put = slow_put
+    futures = []
+    client = threading.Thread(target=lambda: futures.append(batcher.submit(np.ones(2))))
+    client.start()
+    time.sleep(0.02)
+    batcher.close()
+    client.join()
+
+    # close waited for the row to be queued, so it was scored before the worker stopped
+    assert futures[0].done()
+    assert futures[0].result() == 4
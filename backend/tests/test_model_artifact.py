@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from data_generator import generate_synthetic_data
+from model_artifact import convert_joblib, load_flat_artifact, save_flat_artifact
+from model_compaction import compact
+
+
+@pytest.fixture(scope='module')
+def converted(model_path, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('artifact') / 'model.hwf')
+    forest, plan = convert_joblib(model_path, path)
+    X = plan.transform_frame(generate_synthetic_data(500).drop('price', axis=1))
+    return path, forest, plan, X
+
+
+def test_artifact_matches_sklearn(converted, components):
+    path, _, _, X = converted
+    forest, _, header = load_flat_artifact(path)
+    assert np.array_equal(forest.predict_per_tree(X), np.stack([
+        tree.predict(X) for tree in components['model'].estimators_
+    ]))
+    # Thresholds are stored once, in the precision they are compared in
+    assert header['arrays']['threshold']['dtype'] == '<f4'
+    assert 'threshold32' not in header['arrays']
+
+
+@pytest.mark.parametrize('spec', ['f32', 'f16', 't10-d8'])
+def test_variant_round_trip(converted, tmp_path, spec):
+    _, forest, plan, X = converted
+    variant = compact(forest, spec)
+    path = str(tmp_path / f"{spec}.hwf")
+    save_flat_artifact(path, variant, plan)
+    loaded, _, _ = load_flat_artifact(path)
+    assert loaded.threshold.dtype == (np.float16 if spec == 'f16' else np.float32)
+    assert np.array_equal(loaded.predict(X), variant.predict(X))
@@ -0,0 +1,46 @@
+import numpy as np
+
+from data_generator import iter_synthetic_chunks
+from feature_plan import FeaturePlan
+from model_trainer import (
+    _build_design_matrix, _fit_preprocessing, _fold_bounds, _peak_memory_mb, _region_positions
+)
+
+CAT_COLS = ['neighborhood', 'condition']
+NUM_COLS = ['bedrooms', 'bathrooms', 'square_feet', 'lot_size', 'year_built', 'has_garage', 'has_pool']
+
+
+def test_region_positions_keep_the_random_split():
+    shuffled = np.random.default_rng(0).permutation(1000)
+    bounds = np.append(_fold_bounds(800, 3), 1000)
+    positions = _region_positions(shuffled, bounds)
+
+    assert np.array_equal(np.sort(positions), np.arange(1000))
+    region = np.searchsorted(bounds, shuffled, side='right')
+    assert np.array_equal(np.searchsorted(bounds, positions, side='right'), region)
+    # Rows keep their input order within each region
+    for k in np.unique(region):
+        assert np.all(np.diff(positions[region == k]) == 1)
+
+
+def test_design_matrix_rows_land_at_their_positions():
+    def chunks():
+        return iter_synthetic_chunks(3000, chunk_size=700)
+
+    encoder, scaler, n_rows = _fit_preprocessing(chunks(), CAT_COLS, NUM_COLS)
+    plan = FeaturePlan.from_fitted(encoder, scaler, CAT_COLS, NUM_COLS)
+    shuffled = np.random.default_rng(42).permutation(n_rows)
+    positions = _region_positions(shuffled, np.append(_fold_bounds(2400, 3), n_rows))
+
+    X, y = _build_design_matrix(chunks(), plan, n_rows, positions)
+    data = np.vstack([plan.transform_frame(chunk) for chunk in chunks()])
+    prices = np.concatenate([chunk['price'].to_numpy() for chunk in chunks()])
+    expected = np.empty_like(X)
+    expected[positions] = data
+    assert np.array_equal(X, expected)
+    assert np.array_equal(y[positions], prices)
+
+
+def test_peak_memory_is_reported_in_mb():
+    peak = _peak_memory_mb()
+    assert peak is None or 10 < peak < 100_000
@@ -0,0 +1,48 @@
+import pytest
+
+from flat_forest import FlatForest
+from prediction_service import ModelState
+
+HOUSE = {
+    'bedrooms': 3, 'bathrooms': 2, 'squareFeet': 1800, 'lotSize': 0.25, 'yearBuilt': 1995,
+    'neighborhood': 'midtown', 'condition': 'good', 'hasGarage': True, 'hasPool': False
+}
+
+SWEEP = {'squareFeet': {'start': 1000, 'stop': 4000, 'num': 4}}
+
+# Both scoring paths: FlatForest.predict_grid and score_matrix
+SERVICES = [{'flat_forest': True}, {'confidence_mode': 'heuristic'}]
+
+
+def inflate(monkeypatch, index):
+    """Multiply one point's price by 100; index -1 is the base house on both paths"""
+    def wrap(original):
+        def scaled(*args, **kwargs):
+            prices = original(*args, **kwargs).copy()
+            prices[index] *= 100
+            return prices
+        return scaled
+    monkeypatch.setattr(FlatForest, 'predict_grid', wrap(FlatForest.predict_grid))
+    monkeypatch.setattr(ModelState, 'score_matrix', wrap(ModelState.score_matrix))
+
+
+@pytest.mark.parametrize('kwargs', SERVICES)
+def test_sweep_nulls_out_of_range_points(make_service, monkeypatch, kwargs):
+    service = make_service(**kwargs)
+    clean = service.sweep(HOUSE, SWEEP)
+    assert clean['outOfRange'] == 0
+
+    inflate(monkeypatch, 0)
+    result = service.sweep(HOUSE, SWEEP)
+    assert result['outOfRange'] == 1
+    assert result['prices'] == [None] + clean['prices'][1:]
+    assert result['marginal']['squareFeet'] == [None] + clean['marginal']['squareFeet'][1:]
+    assert result['basePrice'] == clean['basePrice']
+
+
+@pytest.mark.parametrize('kwargs', SERVICES)
+def test_sweep_fails_when_base_price_is_out_of_range(make_service, monkeypatch, kwargs):
+    service = make_service(**kwargs)
+    inflate(monkeypatch, -1)
+    with pytest.raises(RuntimeError, match='out of reasonable range'):
+        service.sweep(HOUSE, SWEEP)
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from validation import validate_frame, validate_predict_input
+
+BASE = {
+    'bedrooms': 3, 'bathrooms': 2, 'squareFeet': 1800, 'lotSize': 0.25, 'yearBuilt': 1995,
+    'neighborhood': 'midtown', 'condition': 'good', 'hasGarage': True, 'hasPool': False
+}
+
+CASES = [
+    {},
+    {'bedrooms': 'abc'},
+    {'bedrooms': '4'},
+    {'bedrooms': 0},
+    {'bathrooms': None},
+    {'squareFeet': '12e2'},
+    {'squareFeet': 300},
+    {'lotSize': 'x'},
+    {'yearBuilt': '1990.7'},
+    {'yearBuilt': ' 1990 '},
+    {'yearBuilt': 1990.7},
+    {'yearBuilt': None},
+    {'yearBuilt': 1850},
+    {'bedrooms': 'zz', 'yearBuilt': 'abc'},
+    {'condition': 'new'},
+    {'neighborhood': None},
+]
+
+
+def predict_error(body):
+    try:
+        validate_predict_input(body)
+    except ValueError as e:
+        return str(e)
+    return None
+
+
+@pytest.mark.parametrize('changes', CASES)
+def test_frame_matches_predict_messages(changes):
+    body = dict(BASE, **changes)
+    # One row alone, so the column dtype follows the value as in JSON
+    _, errors = validate_frame(pd.DataFrame([body]))
+    assert errors[0] == predict_error(body)
+
+
+def test_mixed_column_matches_predict_messages():
+    bodies = [dict(BASE, **changes) for changes in CASES]
+    parsed, errors = validate_frame(pd.DataFrame(bodies))
+    assert list(errors) == [predict_error(body) for body in bodies]
+
+    valid = pd.isnull(errors)
+    # int() truncates numbers but only accepts integer strings
+    assert parsed['year_built'][valid].tolist() == [
+        float(int(body['yearBuilt'])) for body, ok in zip(bodies, valid) if ok
+    ]
+
+
+def test_missing_cells_get_the_null_message():
+    frame = pd.DataFrame([dict(BASE, bedrooms=np.nan), dict(BASE, yearBuilt='')])
+    _, errors = validate_frame(frame)
+    assert errors[0] == predict_error(dict(BASE, bedrooms=None))
+    assert errors[1] == predict_error(dict(BASE, yearBuilt=''))
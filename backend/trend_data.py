@@ -0,0 +1,90 @@
+"""
+Deterministic 12-month price trend series shown next to each prediction.
+
+Each series is a function of the predicted price and a per-request key, so the
+same house always gets the same chart. The random variation comes from a
+counter-based hash of the key rather than a shared RNG, which keeps the
+generator thread-safe and lets a whole batch be computed with array arithmetic.
+"""
+import datetime
+import hashlib
+from functools import lru_cache
+
+import numpy as np
+
+N_MONTHS = 12
+
+# Fixed English abbreviations so labels do not depend on the process locale
+MONTH_ABBR = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+# Historical prices vary by U(VARIANCE_LOW, VARIANCE_HIGH) of the prediction,
+# on top of a TREND_STEP share per month of slight upward trend
+VARIANCE_LOW = -0.05
+VARIANCE_HIGH = 0.1
+TREND_STEP = 0.01
+
+_GOLDEN_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+_STEPS = np.arange(1, N_MONTHS + 1, dtype=np.uint64) * _GOLDEN_GAMMA
+_MONTH_INDEX = np.arange(N_MONTHS, dtype=np.float64)
+
+
+@lru_cache(maxsize=N_MONTHS)
+def _labels_for_month(current_month):
+    return tuple(MONTH_ABBR[(current_month - 11 + i) % 12] for i in range(N_MONTHS))
+
+
+def month_labels(today=None):
+    """Month labels of the series; computed once per calendar month"""
+    today = today or datetime.date.today()
+    return _labels_for_month(today.month)
+
+
+def trend_seed(key):
+    """Stable 64-bit seed for a request key (any value with a deterministic repr)"""
+    digest = hashlib.blake2b(repr(key).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def _uniforms(seeds):
+    """SplitMix64 stream: N_MONTHS uniforms in [0, 1) per seed, shape (n, N_MONTHS)"""
+    z = np.asarray(seeds, dtype=np.uint64)[:, np.newaxis] + _STEPS
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+
+def generate_trend_prices(predicted_prices, keys):
+    """
+    Compute trend prices for a batch of predictions.
+
+    Args:
+        predicted_prices: Sequence of n predicted prices
+        keys: Sequence of n request keys seeding each series
+
+    Returns:
+        Integer array of shape (n, N_MONTHS)
+    """
+    prices = np.asarray(predicted_prices, dtype=np.float64)[:, np.newaxis]
+    variance = prices * (VARIANCE_LOW + (VARIANCE_HIGH - VARIANCE_LOW) * _uniforms([trend_seed(key) for key in keys]))
+    historical = prices - variance + _MONTH_INDEX * prices * TREND_STEP
+    return np.rint(historical).astype(np.int64)
+
+
+def generate_trend_series(predicted_prices, keys, today=None):
+    """
+    Build the trendData payload for a batch of predictions.
+
+    Returns:
+        List with one list of {'month', 'price'} dicts per prediction
+    """
+    labels = month_labels(today)
+    return [
+        [{'month': month, 'price': price} for month, price in zip(labels, row)]
+        for row in generate_trend_prices(predicted_prices, keys).tolist()
+    ]
+
+
+def generate_trend_data(predicted_price, key, today=None):
+    """Build the trendData payload for a single prediction"""
+    return generate_trend_series([predicted_price], [key], today)[0]
@@ -0,0 +1,271 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+# Request field -> training column name
+FIELD_COLUMNS = {
+    'bedrooms': 'bedrooms',
+    'bathrooms': 'bathrooms',
+    'squareFeet': 'square_feet',
+    'lotSize': 'lot_size',
+    'yearBuilt': 'year_built',
+    'neighborhood': 'neighborhood',
+    'condition': 'condition',
+    'hasGarage': 'has_garage',
+    'hasPool': 'has_pool'
+}
+
+CONDITIONS = ['poor', 'fair', 'good', 'excellent']
+
+# Request fields a /predict/sweep axis can vary by range, and the ones that
+# take a list of values or "all" (every category the model knows)
+SWEEP_RANGE_FIELDS = ['bedrooms', 'bathrooms', 'squareFeet', 'lotSize', 'yearBuilt']
+SWEEP_CATEGORY_FIELDS = ['neighborhood', 'condition', 'hasGarage', 'hasPool']
+
+# Spellings accepted for boolean columns in tabular input
+_TRUE_VALUES = {'true', '1', '1.0', 'yes', 't', 'y'}
+_FALSE_VALUES = {'false', '0', '0.0', 'no', 'f', 'n'}
+
+
+def validate_predict_input(data):
+    """Validate a single /predict request body, raising ValueError on the first problem"""
+    required_fields = [
+        'bedrooms', 'bathrooms', 'squareFeet', 'lotSize',
+        'yearBuilt', 'neighborhood', 'condition', 'hasGarage', 'hasPool'
+    ]
+    
+    for field in required_fields:
+        if field not in data:
+            raise ValueError(f"Missing required field: {field}")
+    
+    try:
+        # Convert and validate numeric fields
+        bedrooms = float(data['bedrooms'])
+        bathrooms = float(data['bathrooms'])
+        square_feet = float(data['squareFeet'])
+        lot_size = float(data['lotSize'])
+        year_built = int(data['yearBuilt'])
+        
+        if bedrooms <= 0 or bedrooms > 10:
+            raise ValueError("Bedrooms must be between 1 and 10")
+        if bathrooms <= 0 or bathrooms > 10:
+            raise ValueError("Bathrooms must be between 1 and 10")
+        if square_feet < 500 or square_feet > 10000:
+            raise ValueError("Square feet must be between 500 and 10,000")
+        if lot_size < 0.1 or lot_size > 5:
+            raise ValueError("Lot size must be between 0.1 and 5 acres")
+        if year_built < 1900 or year_built > 2024:
+            raise ValueError("Year built must be between 1900 and 2024")
+            
+        # Validate categorical fields
+        if not isinstance(data['neighborhood'], str):
+            raise ValueError("Neighborhood must be a string")
+        if data['condition'] not in ['poor', 'fair', 'good', 'excellent']:
+            raise ValueError("Invalid condition value")
+        if not isinstance(data['hasGarage'], bool):
+            raise ValueError("hasGarage must be a boolean")
+        if not isinstance(data['hasPool'], bool):
+            raise ValueError("hasPool must be a boolean")
+            
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid input data: {str(e)}")
+
+
+def sweep_axis_length(field, spec, categories):
+    """
+    Number of values a structurally valid sweep axis names, counted without
+    building them (repeats included).
+
+    Args:
+        field: Request field being swept
+        spec: "all", {"values": [...]} or {"start", "stop", "num"}
+        categories: Dict of category field -> the values "all" expands to
+    """
+    if spec == 'all':
+        return len(categories[field])
+    if 'values' in spec:
+        return len(spec['values'])
+    return spec['num']
+
+
+def validate_sweep_input(data, max_points, categories):
+    """
+    Validate a /predict/sweep request body, raising ValueError on the first problem.
+
+    The base house must be a valid /predict body, and so must the base house
+    with any single swept value substituted in (for ranges, both ends). The
+    grid size is checked before any swept value is looked at.
+
+    Args:
+        data: Request body
+        max_points: Largest accepted grid
+        categories: Dict of category field -> the values "all" expands to
+    """
+    house = data.get('house')
+    if not isinstance(house, dict):
+        raise ValueError("Request must contain a house object")
+    validate_predict_input(house)
+
+    sweep = data.get('sweep')
+    if not isinstance(sweep, dict) or not sweep:
+        raise ValueError("Request must contain a sweep object naming at least one field")
+
+    for field, spec in sweep.items():
+        if field not in SWEEP_RANGE_FIELDS and field not in SWEEP_CATEGORY_FIELDS:
+            raise ValueError(f"Cannot sweep unknown field: {field}")
+        if spec == 'all':
+            if field in SWEEP_RANGE_FIELDS:
+                raise ValueError(f"Sweep of {field} needs a range or a list of values")
+            continue
+        if not isinstance(spec, dict):
+            raise ValueError(f"Sweep of {field} must be \"all\" or an object")
+
+        if 'values' in spec:
+            values = spec['values']
+            if not isinstance(values, list) or not values:
+                raise ValueError(f"Sweep of {field} needs a non-empty list of values")
+        elif field in SWEEP_RANGE_FIELDS and {'start', 'stop', 'num'} <= spec.keys():
+            num = spec['num']
+            if not isinstance(num, int) or isinstance(num, bool) or not 2 <= num <= max_points:
+                raise ValueError(f"Sweep of {field} needs num to be an integer between 2 and {max_points}")
+        else:
+            expected = "start, stop and num, or values" if field in SWEEP_RANGE_FIELDS else "values"
+            raise ValueError(f"Sweep of {field} needs {expected}")
+
+    n_points = math.prod(sweep_axis_length(field, spec, categories) for field, spec in sweep.items())
+    if n_points > max_points:
+        raise ValueError(f"Sweep too large: {n_points} points, at most {max_points} per request")
+
+    for field, spec in sweep.items():
+        if spec == 'all':
+            continue
+        values = spec['values'] if 'values' in spec else [spec['start'], spec['stop']]
+        for value in values:
+            validate_predict_input(dict(house, **{field: value}))
+
+
+def normalize_columns(frame):
+    """Rename camelCase request fields to the snake_case training columns"""
+    return frame.rename(columns={field: col for field, col in FIELD_COLUMNS.items() if field != col})
+
+
+def _to_flag(series):
+    """Parse a boolean column; returns (0/1 values, mask of unparseable entries)"""
+    if series.dtype == bool:
+        return series.to_numpy().astype(np.int64), np.zeros(len(series), dtype=bool)
+    text = series.astype(str).str.strip().str.lower()
+    is_true = text.isin(_TRUE_VALUES).to_numpy()
+    is_false = text.isin(_FALSE_VALUES).to_numpy()
+    return is_true.astype(np.int64), ~(is_true | is_false)
+
+
+def _conversion_error(convert, value):
+    """Message validate_predict_input reports when convert(value) fails, else None"""
+    try:
+        result = convert(value)
+    except (ValueError, TypeError) as e:
+        return str(e)
+    # float('nan') passes every range check; treat it as a missing cell
+    if result != result:
+        return _conversion_error(convert, None)
+    return None
+
+
+def _to_number(series, convert):
+    """
+    Convert a numeric column as validate_predict_input does with float() or
+    int(). Returns (float64 values, object array of error messages or None).
+
+    Numeric columns behave like JSON numbers, so int() only truncates. Other
+    columns go through convert itself, once per distinct value, so a string
+    such as "1990.7" fails int() with Python's own message. Missing cells get
+    the message for a JSON null.
+    """
+    n_rows = len(series)
+    errors = np.full(n_rows, None, dtype=object)
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        values = series.to_numpy(dtype=np.float64)
+        missing = np.isnan(values)
+        errors[missing] = _conversion_error(convert, None)
+        return (np.trunc(values) if convert is int else values), errors
+
+    codes, uniques = pd.factorize(series.to_numpy(dtype=object), use_na_sentinel=False)
+    unique_values = np.empty(len(uniques))
+    unique_errors = np.empty(len(uniques), dtype=object)
+    for i, value in enumerate(uniques):
+        if pd.isnull(value):
+            value = None
+        unique_errors[i] = _conversion_error(convert, value)
+        unique_values[i] = np.nan if unique_errors[i] is not None else convert(value)
+    return unique_values[codes], unique_errors[codes]
+
+
+def validate_frame(frame):
+    """
+    Vectorized counterpart of validate_predict_input for tabular input.
+
+    Applies the same rules in the same order to every row at once and reports
+    the first failing rule per row with the same message. Numeric cells are
+    treated like JSON numbers and text cells like JSON strings, so "1990.7" is
+    rejected as a year just as it is by /predict. Tabular sources have no
+    nulls or native booleans: empty cells get the message /predict gives for
+    null, and hasGarage/hasPool also accept true/false, 1/0 and yes/no
+    spellings.
+
+    Args:
+        frame: DataFrame with camelCase or snake_case columns
+
+    Returns:
+        tuple: (parsed, errors) where parsed is a DataFrame with the training
+        columns and types (invalid rows hold placeholder values) and errors is
+        an object array with None for valid rows and a message otherwise
+    """
+    frame = normalize_columns(frame)
+    n_rows = len(frame)
+    errors = np.full(n_rows, None, dtype=object)
+
+    for field, col in FIELD_COLUMNS.items():
+        if col not in frame.columns:
+            errors[:] = f"Missing required field: {field}"
+            return pd.DataFrame(index=frame.index), errors
+
+    def reject(mask, message):
+        errors[mask & pd.isnull(errors)] = f"Invalid input data: {message}"
+
+    numeric = {}
+    for col in ('bedrooms', 'bathrooms', 'square_feet', 'lot_size', 'year_built'):
+        numeric[col], messages = _to_number(frame[col], int if col == 'year_built' else float)
+        failed = pd.notnull(messages) & pd.isnull(errors)
+        errors[failed] = "Invalid input data: " + messages[failed]
+
+    with np.errstate(invalid='ignore'):
+        bedrooms, bathrooms = numeric['bedrooms'], numeric['bathrooms']
+        square_feet, lot_size, year_built = numeric['square_feet'], numeric['lot_size'], numeric['year_built']
+        reject((bedrooms <= 0) | (bedrooms > 10), "Bedrooms must be between 1 and 10")
+        reject((bathrooms <= 0) | (bathrooms > 10), "Bathrooms must be between 1 and 10")
+        reject((square_feet < 500) | (square_feet > 10000), "Square feet must be between 500 and 10,000")
+        reject((lot_size < 0.1) | (lot_size > 5), "Lot size must be between 0.1 and 5 acres")
+        reject((year_built < 1900) | (year_built > 2024), "Year built must be between 1900 and 2024")
+
+    neighborhood = frame['neighborhood']
+    reject(~neighborhood.map(lambda value: isinstance(value, str)).to_numpy(dtype=bool), "Neighborhood must be a string")
+    condition = frame['condition']
+    reject(~condition.isin(CONDITIONS).to_numpy(), "Invalid condition value")
+    has_garage, bad_garage = _to_flag(frame['has_garage'])
+    reject(bad_garage, "hasGarage must be a boolean")
+    has_pool, bad_pool = _to_flag(frame['has_pool'])
+    reject(bad_pool, "hasPool must be a boolean")
+
+    parsed = pd.DataFrame({
+        'bedrooms': numeric['bedrooms'],
+        'bathrooms': numeric['bathrooms'],
+        'square_feet': numeric['square_feet'],
+        'lot_size': numeric['lot_size'],
+        'year_built': numeric['year_built'],
+        'neighborhood': neighborhood.astype(str).to_numpy(),
+        'condition': condition.astype(str).to_numpy(),
+        'has_garage': has_garage,
+        'has_pool': has_pool
+    }, index=frame.index)
+    return parsed, errors